@@ -0,0 +1,130 @@
+"""
+Per-call overhead of collidevector dispatch
+
+Compares the multipledispatch implementation collidevector used to have
+against the CollisionRegistry based collidevector and its scalar fast
+path collidevector_xy. Run from the repository root with:
+    python -m benchmarks.bench_collide_dispatch
+"""
+
+import timeit
+import numpy as np
+from multipledispatch import Dispatcher
+
+from utils.floatshapes import FloatRect, FloatCircle
+from utils.collide import collidevector, collidevector_xy
+
+
+NUMBER = 20_000
+REPEAT = 5
+
+
+# The previous implementation, kept here as the point of comparison
+
+_legacy = Dispatcher("legacy_collidevector")
+
+
+@_legacy.register(FloatRect, FloatRect)
+def _(a, b):
+
+    flipx = a.cx < b.cx
+    flipy = a.cy < b.cy
+
+    dx = (b.left - a.right) if flipx else (b.right - a.left)
+    dy = (b.bottom - a.top) if flipy else (b.top - a.bottom)
+
+    if (flipx and dx > 0) or (not flipx and dx < 0):
+        dx = 0.
+    if (flipy and dy > 0) or (not flipy and dy < 0):
+        dy = 0.
+
+    if np.abs(dx) < np.abs(dy):
+        return np.array((dx, 0.))
+    else:
+        return np.array((0., dy))
+
+
+@_legacy.register(FloatCircle, FloatRect)
+def _(a, b):
+
+    hw, hh = b.width / 2, b.height / 2
+    dcx, dcy = a.center - b.center
+
+    if np.abs(dcx) <= hw or np.abs(dcy) <= hh:
+        return _legacy(a.get_rect(), b)
+
+    if (np.abs(dcx) - hw)**2 + (np.abs(dcy) - hh)**2 < a.r**2:
+
+        if (dcx >= 0 and dcy >= 0):
+            corner = b.topright
+        elif (dcx < 0 and dcy >= 0):
+            corner = b.topleft
+        elif (dcx >= 0 and dcy < 0):
+            corner = b.bottomright
+        elif (dcx < 0 and dcy < 0):
+            corner = b.bottomleft
+
+        dx, dy = a.center - corner
+
+        dist = np.sqrt(dx**2 + dy**2)
+        return np.array((dx, dy)) * (a.r / dist - 1)
+
+    return np.array((0., 0.))
+
+
+@_legacy.register(FloatRect, FloatCircle)
+def _(a, b):
+
+    return -_legacy(b, a)
+
+
+@_legacy.register(FloatCircle, FloatCircle)
+def _(a, b):
+
+    dx = a.cx - b.cx
+    dy = a.cy - b.cy
+    sqdist = dx**2 + dy**2
+    radsum = a.r + b.r
+
+    if sqdist < radsum**2:
+        return np.array((dx, dy)) * (radsum / np.sqrt(sqdist) - 1)
+
+    return np.array((0., 0.))
+
+
+CASES = {
+    "rect-rect": (FloatRect(0, 0, 2, 2), FloatRect(1, 1, 2, 2)),
+    "circle-rect (edge)": (FloatCircle(0, 1, 1), FloatRect(0.5, 0, 2, 2)),
+    "circle-rect (corner)": (FloatCircle(-0.5, -0.5, 1), FloatRect(0, 0, 2, 2)),
+    "rect-circle": (FloatRect(0.5, 0, 2, 2), FloatCircle(0, 1, 1)),
+    "circle-circle": (FloatCircle(0, 0, 1), FloatCircle(1, 0.5, 1)),
+}
+
+IMPLEMENTATIONS = {
+    "multipledispatch": _legacy,
+    "collidevector": collidevector,
+    "collidevector_xy": collidevector_xy,
+}
+
+
+def _ns_per_call(func, a, b):
+
+    times = timeit.repeat(lambda: func(a, b), number=NUMBER, repeat=REPEAT)
+    return min(times) / NUMBER * 1e9
+
+
+def main():
+
+    names = list(IMPLEMENTATIONS)
+    print(f"{'case':<22}" + "".join(f"{n:>18}" for n in names))
+
+    for case, (a, b) in CASES.items():
+
+        assert np.allclose(_legacy(a, b), collidevector_xy(a, b))
+
+        row = [_ns_per_call(f, a, b) for f in IMPLEMENTATIONS.values()]
+        print(f"{case:<22}" + "".join(f"{t:>15.0f} ns" for t in row))
+
+
+if __name__ == "__main__":
+    main()
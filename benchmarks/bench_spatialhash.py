@@ -0,0 +1,84 @@
+"""
+Spatial hash broadphase benchmark
+
+Run from the repository root with:
+    python -m benchmarks.bench_spatialhash
+"""
+
+import time
+import numpy as np
+
+from utils.floatshapes import FloatCircle, FloatRect
+from utils.spatialhash import SpatialHash
+
+
+SIZES = (1_000, 10_000, 100_000)
+RADIUS = 0.5
+DENSITY = 0.1  # objects per unit area
+STEP = 0.03  # typical displacement per tick
+NQUERIES = 1000
+
+
+def _timed(func):
+
+    t0 = time.perf_counter()
+    result = func()
+    return time.perf_counter() - t0, result
+
+
+def bench(n, cellsize=2 * RADIUS, seed=0):
+
+    rng = np.random.default_rng(seed)
+    side = np.sqrt(n / DENSITY)
+
+    pos = rng.uniform(0, side, (n, 2))
+    circles = [FloatCircle(x, y, RADIUS) for x, y in pos]
+
+    sh = SpatialHash(cellsize)
+
+    def insert():
+        for i, c in enumerate(circles):
+            sh.insert(i, c)
+
+    moves = rng.uniform(-STEP, STEP, (n, 2))
+    moved = [c.shifted(dx, dy) for c, (dx, dy) in zip(circles, moves)]
+
+    def update():
+        for i, c in enumerate(moved):
+            sh.update(i, c)
+
+    qpos = rng.uniform(0, side, (NQUERIES, 2))
+    qrects = [FloatRect.from_center(x, y, 10, 10) for x, y in qpos]
+
+    def query():
+        for r in qrects:
+            sh.query(r)
+
+    t_insert, _ = _timed(insert)
+    t_update, _ = _timed(update)
+    t_pairs, pairs = _timed(sh.pairs)
+    t_query, _ = _timed(query)
+
+    return {
+        "n": n,
+        "insert_s": t_insert,
+        "update_s": t_update,
+        "pairs_s": t_pairs,
+        "npairs": len(pairs),
+        "query_us": t_query / NQUERIES * 1e6,
+    }
+
+
+def main():
+
+    print(f"{'n':>8} {'insert':>9} {'update':>9} {'pairs':>9} "
+          f"{'npairs':>8} {'query':>10}")
+
+    for n in SIZES:
+        r = bench(n)
+        print(f"{r['n']:>8} {r['insert_s']:>8.3f}s {r['update_s']:>8.3f}s "
+              f"{r['pairs_s']:>8.3f}s {r['npairs']:>8} {r['query_us']:>8.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,329 @@
+"""
+Benchmark suite: collision, geometry, rendering and input dispatch
+
+Every case is run at each size (number of shapes, sprites or events),
+offscreen through the SDL dummy video driver, and reports:
+    ops/s    items processed per second (pairs, rects, events, frames),
+             from the median iteration
+    p50..p99 time of one iteration (one frame for rendering), in ms
+    alloc    peak memory allocated by one iteration, from tracemalloc
+
+Results can be saved as JSON and later compared against, flagging any
+case whose ops/s dropped by more than the tolerance. Baselines are
+only meaningful on the machine they were recorded on. Run from the
+repository root with:
+    python -m benchmarks.suite
+    python -m benchmarks.suite --save benchmarks/baseline.json
+    python -m benchmarks.suite --baseline benchmarks/baseline.json
+"""
+
+import os
+os.environ.setdefault("SDL_VIDEODRIVER", "dummy")
+
+import argparse
+import json
+import platform
+import sys
+import time
+import tracemalloc
+import numpy as np
+import pygame as pg
+
+from inputs.keyboard import KeyDispatcher, KeyEvent, KSTATE_PRESS
+from render.scenes import Scene, Camera, Sprite, SpriteCircle, SpriteRect
+from utils.collide import collidevector_xy, collidevectors
+from utils.floatshapes import (FloatRect, FloatCircle, FloatRectArray,
+                               FloatCircleArray)
+
+
+SIZES = (10, 100, 1_000, 10_000, 100_000)
+SCREENSIZE = (900, 600)
+DENSITY = 0.1  # shapes per unit area
+MIN_ITERATIONS = 5
+MAX_ITERATIONS = 200
+TIME_BUDGET = 1.0  # seconds of timed iterations per case and size
+TOLERANCE = 0.3  # timings on shared machines easily vary by 20%
+
+
+# Cases
+#
+# Each case is a function (n, rng) -> (iteration, items): iteration()
+# does the work once, processing items items.
+
+
+def _shapes(n, rng):
+
+    side = np.sqrt(n / DENSITY)
+    pos = rng.uniform(0, side, (n, 2))
+    size = rng.uniform(0.5, 2, (n, 2))
+
+    return side, pos, size
+
+
+def case_collide_xy(n, rng):
+    """collidevector_xy on n rect/circle pairs, one call each"""
+
+    _, pos, size = _shapes(n, rng)
+    offsets = rng.uniform(-1, 1, (n, 2))
+
+    pairs = []
+    for i, ((x, y), (w, h), (dx, dy)) in enumerate(zip(pos, size, offsets)):
+        a = FloatRect.from_center(x, y, w, h)
+        if i % 2:
+            b = FloatCircle(x + dx, y + dy, w / 2)
+        else:
+            b = FloatRect.from_center(x + dx, y + dy, h, w)
+        pairs.append((b, a))
+
+    def iteration():
+        for a, b in pairs:
+            collidevector_xy(a, b)
+
+    return iteration, n
+
+
+def case_collide_batch(n, rng):
+    """collidevectors on arrays of n circle/rect pairs"""
+
+    _, pos, size = _shapes(n, rng)
+    offsets = rng.uniform(-1, 1, (n, 2))
+
+    rects = FloatRectArray.from_center(pos[:, 0], pos[:, 1],
+                                       size[:, 0], size[:, 1])
+    circles = FloatCircleArray(pos[:, 0] + offsets[:, 0],
+                               pos[:, 1] + offsets[:, 1], size[:, 1] / 2)
+
+    def iteration():
+        collidevectors(circles, rects)
+
+    return iteration, n
+
+
+def case_geometry_rect(n, rng):
+    """FloatRect shifted, colliderect and rotated_bounds on n rects"""
+
+    _, pos, size = _shapes(n, rng)
+    rects = [FloatRect.from_center(x, y, w, h)
+             for (x, y), (w, h) in zip(pos, size)]
+    other = FloatRect.from_center(*pos.mean(0), 10, 10)
+
+    def iteration():
+        for r in rects:
+            r.shifted(0.1, 0.1).colliderect(other)
+            r.rotated_bounds(30)
+
+    return iteration, n
+
+
+def case_geometry_array(n, rng):
+    """the same on a FloatRectArray of n rects"""
+
+    _, pos, size = _shapes(n, rng)
+    rects = FloatRectArray.from_center(pos[:, 0], pos[:, 1],
+                                       size[:, 0], size[:, 1])
+    other = FloatRect.from_center(*pos.mean(0), 10, 10)
+
+    def iteration():
+        rects.shifted(0.1, 0.1).colliderect(other)
+        rects.rotated_bounds(30)
+
+    return iteration, n
+
+
+def case_render(n, rng):
+    """Scene.draw of n mixed sprites, the camera panning every frame"""
+
+    side, pos, size = _shapes(n, rng)
+
+    screen = pg.display.get_surface()
+    image = pg.Surface((32, 32))
+    image.fill((200, 120, 40))
+
+    camera = Camera(SCREENSIZE, scale=32.0, center=(side / 2, side / 2))
+    scene = Scene(camera, bg=(255, 255, 255))
+
+    for i, ((x, y), (w, h)) in enumerate(zip(pos, size)):
+
+        rect = FloatRect.from_center(x, y, w, h)
+        color = tuple(int(c) for c in rng.integers(1, 255, 3))
+        angle = 0 if i % 4 else float(rng.uniform(0, 360))
+
+        if i % 3 == 0:
+            sprite = Sprite(image, rect, angle=angle)
+        elif i % 3 == 1:
+            sprite = SpriteCircle(color, rect)
+        else:
+            sprite = SpriteRect(color, rect, angle=angle)
+
+        scene.add_sprite(sprite, static=(i % 5 == 0))
+
+    frame = [0]
+
+    def iteration():
+        frame[0] += 1
+        camera.center = camera.center + (0.05, 0.02 * (frame[0] % 7 - 3))
+        scene.draw(screen)
+
+    return iteration, 1
+
+
+def case_dispatch(n, rng):
+    """KeyDispatcher.dispatch of n key events, half of them bound"""
+
+    dispatcher = KeyDispatcher()
+    keys = list(range(pg.K_a, pg.K_z + 1))
+    count = [0]
+
+    def press():
+        count[0] += 1
+
+    for key in keys[::2]:
+        dispatcher.bind(KeyEvent(key, None, KSTATE_PRESS), press)
+
+    events = [pg.event.Event(pg.KEYDOWN if i % 2 else pg.KEYUP,
+                             key=int(rng.choice(keys)), mod=0)
+              for i in range(n)]
+
+    def iteration():
+        for e in events:
+            dispatcher.dispatch(e)
+
+    return iteration, n
+
+
+CASES = {
+    "collide.xy": case_collide_xy,
+    "collide.batch": case_collide_batch,
+    "geometry.rect": case_geometry_rect,
+    "geometry.array": case_geometry_array,
+    "render.scene": case_render,
+    "input.dispatch": case_dispatch,
+}
+
+
+# Running
+
+def measure(case, n, seed=0, time_budget=TIME_BUDGET):
+
+    iteration, items = case(n, np.random.default_rng(seed))
+    iteration()  # warm-up
+
+    times = []
+    total = 0.
+
+    while len(times) < MAX_ITERATIONS and (
+            len(times) < MIN_ITERATIONS or total < time_budget):
+        t0 = time.perf_counter()
+        iteration()
+        dt = time.perf_counter() - t0
+        times.append(dt)
+        total += dt
+
+    tracemalloc.start()
+    tracemalloc.reset_peak()
+    iteration()
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+
+    p50, p95, p99 = np.percentile(times, (50, 95, 99)) * 1000
+
+    return {
+        "ops_per_s": items / np.median(times),
+        "p50_ms": p50,
+        "p95_ms": p95,
+        "p99_ms": p99,
+        "alloc_peak_kb": peak / 1024,
+        "iterations": len(times),
+    }
+
+
+def run(cases, sizes, time_budget=TIME_BUDGET, out=sys.stdout):
+
+    results = {}
+
+    print(f"{'case':<16} {'n':>7} {'ops/s':>12} {'p50 ms':>9} {'p95 ms':>9} "
+          f"{'p99 ms':>9} {'alloc kB':>10}", file=out)
+
+    for name in cases:
+        for n in sizes:
+
+            r = measure(CASES[name], n, time_budget=time_budget)
+            results[f"{name}/{n}"] = r
+
+            print(f"{name:<16} {n:>7} {r['ops_per_s']:>12.4g} "
+                  f"{r['p50_ms']:>9.3f} {r['p95_ms']:>9.3f} "
+                  f"{r['p99_ms']:>9.3f} {r['alloc_peak_kb']:>10.1f}",
+                  file=out)
+
+    return results
+
+
+def compare(results, baseline, tolerance=TOLERANCE):
+    """
+    (key, baseline ops/s, ops/s) for every result slower than its
+    baseline by more than tolerance (a fraction)
+    """
+
+    regressions = []
+
+    for key, r in results.items():
+
+        base = baseline.get(key)
+        if base is None:
+            continue
+
+        if r["ops_per_s"] < (1 - tolerance) * base["ops_per_s"]:
+            regressions.append((key, base["ops_per_s"], r["ops_per_s"]))
+
+    return regressions
+
+
+def main(argv=None):
+
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--cases", nargs="+", choices=list(CASES),
+                        default=list(CASES))
+    parser.add_argument("--sizes", nargs="+", type=int, default=list(SIZES))
+    parser.add_argument("--budget", type=float, default=TIME_BUDGET,
+                        help="seconds of timed iterations per case and size")
+    parser.add_argument("--save", metavar="JSON",
+                        help="write results to this file")
+    parser.add_argument("--baseline", metavar="JSON",
+                        help="flag regressions against this file")
+    parser.add_argument("--tolerance", type=float, default=TOLERANCE,
+                        help="allowed fractional drop in ops/s")
+    args = parser.parse_args(argv)
+
+    pg.init()
+    pg.display.set_mode(SCREENSIZE)
+
+    results = run(args.cases, args.sizes, args.budget)
+
+    if args.save:
+        with open(args.save, "w") as f:
+            json.dump({"python": platform.python_version(),
+                       "pygame": pg.version.ver,
+                       "numpy": np.__version__,
+                       "results": results}, f, indent=1, sort_keys=True)
+
+    if args.baseline:
+
+        with open(args.baseline) as f:
+            baseline = json.load(f)["results"]
+
+        regressions = compare(results, baseline, args.tolerance)
+
+        for key, old, new in regressions:
+            print(f"REGRESSION {key}: {old:.4g} -> {new:.4g} ops/s "
+                  f"({new / old - 1:+.0%})")
+
+        if regressions:
+            return 1
+
+        print(f"no regressions against {args.baseline}")
+
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,14 +1,20 @@
 import pygame as pg
 import numpy as np
 from pathlib import Path
+import argparse
 import os
+import time
 
 import render
 from render.scenes import Scene, Camera, Sprite, SpriteCircle, SpriteRect
+from render.mipmap import MipSurface
+from render.overlay import ProfilerOverlay
 import inputs.keyboard
 import inputs.controllers
 from utils.floatshapes import FloatRect, FloatCircle
-from utils.collide import collidevector
+from utils.gameloop import GameLoop, Interpolator
+from utils.physics import World, Body
+from utils.profiler import Profiler
 
 
 os.environ['SDL_VIDEO_CENTERED'] = '1'
@@ -24,6 +30,7 @@ BLUE = (0, 0, 255)
 
 TPS = 100
 DT = 1 / TPS
+FPS = 144
 
 SCALE = 64.0
 
@@ -55,13 +62,48 @@ PSPEED = 5.
 
 
 class GameState:
+    """
+    Simulation only: bodies and the player's controls
 
-    def __init__(self, keydispatcher, rendermanager):
+    Needs neither a display nor pygame to be initialised, so it can be
+    ticked headless as fast as the physics allows. keydispatcher is
+    optional; without it, drive the player through paddle directly.
+    """
+
+    def __init__(self, keydispatcher=None):
 
         # Prepare inputs
 
         self.paddle = inputs.controllers.Paddle()
-        self.paddle.bind(keydispatcher, BINDS_PADDLE)
+        if keydispatcher is not None:
+            self.paddle.bind(keydispatcher, BINDS_PADDLE)
+
+        # Prepare game objects
+
+        self.world = World(ccd=True)
+
+        self.wallbody = Body(FloatRect(2, -2, 3, 6), static=True)
+        self.circlebody = Body(FloatCircle(-2, 0, 1))
+        self.playerbody = Body(FloatCircle(0, 0, 1))
+
+        self.world.add_body(self.wallbody)
+        self.world.add_body(self.circlebody)
+        self.world.add_body(self.playerbody)
+
+    def tick(self, dt):
+
+        self.playerbody.velocity = self.paddle.vector * PSPEED
+        self.world.step(dt)
+
+
+class GameView:
+    """Presentation of a GameState: camera, scene and sprites"""
+
+    def __init__(self, gamestate, keydispatcher, rendermanager):
+
+        self.gamestate = gamestate
+
+        # Prepare inputs
 
         self.campad = inputs.controllers.Paddle()
         self.campad.bind(keydispatcher, BINDS_CAMERAPAD)
@@ -72,52 +114,65 @@ class GameState:
         # Prepare scene
 
         self.camera = Camera(WINDOWSIZE)
-        self.scene = Scene(self.camera, bg=WHITE)
+        self.scene = Scene(self.camera, bg=WHITE, dirty_rects=True)
         rendermanager.renderables.append(self.scene)
 
-        # Prepare game objects
-
-        self.wallrect = FloatRect(2, -2, 3, 6)
-        self.circle = FloatCircle(-2, 0, 1)
-        self.playercircle = FloatCircle(0, 0, 1)
+        # Prepare sprites
 
-        # self.playersprite = SpriteCircle.from_circle(BLUE, self.playercircle)
-        self.wallsprite = SpriteRect(BLACK, self.wallrect)
-        self.circlesprite = SpriteCircle.from_circle(BLUE, self.circle)
+        # self.playersprite = SpriteCircle.from_circle(BLUE, gamestate.playerbody.shape)
+        self.wallsprite = SpriteRect(BLACK, gamestate.wallbody.shape)
+        self.circlesprite = SpriteCircle.from_circle(
+            BLUE, gamestate.circlebody.shape)
         sf = pg.image.load(str(PATH_ASSETS / "smiley.png"))
         sf.convert()
-        self.playersprite = Sprite(sf, self.playercircle.get_rect())
+        playerrect = gamestate.playerbody.shape.get_rect()
+        self.playersprite = Sprite(MipSurface(sf, playerrect.size, SCALE,
+                                              background=True),
+                                   playerrect)
 
         self.scene.add_sprite(self.playersprite)
-        self.scene.add_sprite(self.wallsprite)
+        self.scene.add_sprite(self.wallsprite, static=True)
         self.scene.add_sprite(self.circlesprite)
 
-    def tick_cam(self, dt):
+    def tick(self, dt):
 
         self.camera.center += CAMSPEED * dt * self.campad.vector
         self.camera.scale = SCALE * 2 ** self.camzoom.count
 
-    def tick_player(self, dt):
+        self.sync()
 
-        vec = self.paddle.vector * PSPEED * dt
-        self.playercircle = self.playercircle.shifted(*vec)
+    def sync(self):
+        """moves sprites to where their bodies are"""
 
-        cv1 = collidevector(self.playercircle, self.circle)
-        self.circle = self.circle.shifted(*- cv1 / 2)
+        state = self.gamestate
+        self.playersprite.rect = state.playerbody.shape.get_rect()
+        self.circlesprite.rect = state.circlebody.shape.get_rect()
 
-        cv2 = collidevector(self.playercircle, self.wallrect)
-        self.playercircle = self.playercircle.shifted(*(cv1 / 2 + cv2))
 
-        self.playersprite.rect = self.playercircle.get_rect()
-        self.circlesprite.rect = self.circle.get_rect()
+def headless(ticks, dt=DT, gamestate=None):
+    """
+    ticks a GameState as fast as possible without any display; returns
+    the game state and the number of ticks per second achieved
+    """
 
-    def tick(self, dt):
+    if gamestate is None:
+        gamestate = GameState()
 
-        self.tick_cam(dt)
-        self.tick_player(dt)
+    start = time.perf_counter()
 
+    for _ in range(ticks):
+        gamestate.tick(dt)
 
-def main():
+    elapsed = time.perf_counter() - start
+
+    return gamestate, ticks / elapsed if elapsed else float("inf")
+
+
+def main(profile=False, trace=None):
+    """
+    profile: show a ProfilerOverlay of per-phase frame timings
+    trace: path to write a Chrome trace of the session to on exit
+    """
 
     pg.init()
     screen = pg.display.set_mode(size=WINDOWSIZE)
@@ -125,28 +180,75 @@ def main():
     keydispatcher = inputs.keyboard.KeyDispatcher()
     rendermanager = render.RenderManager(screen)
 
-    gamestate = GameState(keydispatcher, rendermanager)
+    gamestate = GameState(keydispatcher)
+    view = GameView(gamestate, keydispatcher, rendermanager)
+
+    profiler = Profiler(enabled=profile or trace is not None,
+                        trace=trace is not None)
+    profiler.watch("blits", lambda: view.scene.blits)
+    profiler.watch("cache.rebuilds", lambda: view.scene.surface_cache.misses,
+                   delta=True)
+    profiler.watch("static.baked", lambda: view.scene.static_layer.baked,
+                   delta=True)
+
+    if profile:
+        rendermanager.renderables.append(ProfilerOverlay(profiler))
+
+    def tick(dt):
+
+        with profiler.scope("tick.state"):
+            gamestate.tick(dt)
+        with profiler.scope("tick.view"):
+            view.tick(dt)
+
+    def draw():
+
+        with profiler.scope("render"):
+            rects = rendermanager.update()
+        with profiler.scope("display"):
+            pg.display.update(rects)
+
+    interpolator = Interpolator(view.scene.sprites, [view.camera])
+    loop = GameLoop(tick, draw, DT, interpolator)
 
     clock = pg.time.Clock()
 
     running = True
     while running:
 
-        for e in pg.event.get():
+        with profiler.scope("events"):
+            for e in pg.event.get():
 
-            if e.type == pg.QUIT:
-                running = False
+                if e.type == pg.QUIT:
+                    running = False
 
-            if e.type == pg.KEYUP or e.type == pg.KEYDOWN:
-                keydispatcher.dispatch(e)
+                if e.type == pg.KEYUP or e.type == pg.KEYDOWN:
+                    with profiler.scope("dispatch"):
+                        keydispatcher.dispatch(e)
 
-        gamestate.tick(DT)
+        loop.frame()
+        profiler.end_frame()
 
-        rendermanager.update()
-        pg.display.flip()
+        clock.tick(FPS)
 
-        clock.tick(TPS)
+    if trace is not None:
+        profiler.export_trace(trace)
 
 
 if __name__ == "__main__":
-    main()
+
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--headless", type=int, metavar="TICKS",
+                        help="run TICKS simulation ticks without a display "
+                             "and report the tick rate")
+    parser.add_argument("--profile", action="store_true",
+                        help="show per-phase frame timings on screen")
+    parser.add_argument("--trace", metavar="JSON",
+                        help="write a Chrome trace of the session on exit")
+    args = parser.parse_args()
+
+    if args.headless is None:
+        main(args.profile, args.trace)
+    else:
+        _, tps = headless(args.headless)
+        print(f"{args.headless} ticks, {tps:.0f} ticks/s")
@@ -15,12 +15,34 @@ class RenderManager:
         return self._screen
 
     def update(self):
+        """
+        Draws every renderable, returns the list of screen regions that
+        changed, to pass on to pg.display.update
+        """
+
+        rects = []
+        full = False
 
         for renderable in self.renderables:
-            renderable.draw(self.screen)
+
+            dirty = renderable.draw(self.screen)
+
+            if dirty is None:
+                full = True
+            else:
+                rects.extend(dirty)
+
+        if full:
+            return [self.screen.get_rect()]
+
+        return rects
 
 
 class Renderable(ABC):
 
     @abstractmethod
-    def draw(self, screen): pass
+    def draw(self, screen):
+        """
+        Draws onto screen; may return a list of pg.Rects bounding what
+        changed, otherwise the whole screen is assumed to have changed
+        """
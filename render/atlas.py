@@ -0,0 +1,329 @@
+import pygame as pg
+from collections import OrderedDict
+
+from render.surfacecache import SurfaceCache
+
+
+class AtlasRegion:
+    """
+    Rectangle of an Atlas page holding one packed image
+
+    Can be given to a Sprite in place of a surface. rect is the image's
+    pg.Rect on its page, without the padding around it.
+    """
+
+    def __init__(self, atlas, page, rect):
+
+        self._atlas = atlas
+        self._page = page
+        self._rect = rect
+        self._surface = None
+
+    @property
+    def atlas(self):
+        return self._atlas
+
+    @property
+    def page(self):
+        return self._page
+
+    @property
+    def rect(self):
+        return self._rect
+
+    @property
+    def size(self):
+        return self._rect.size
+
+    @property
+    def surface(self):
+        """subsurface of the page; shares its pixels"""
+
+        if self._surface is None:
+            page = self._atlas.pages[self._page]
+            self._surface = page.subsurface(self._rect)
+
+        return self._surface
+
+    def scaled(self, pxsize):
+        """the image at pxsize, cut from a scaled page where possible"""
+        return self._atlas._scaled(self, pxsize)
+
+
+class Atlas:
+    """
+    Packs many small images into a few large page surfaces
+
+    Images are placed on pages of pagesize pixels with a skyline
+    bottom-left packer, each surrounded by padding pixels copied from its
+    edges so that scaling doesn't bleed neighbouring images in. Images
+    larger than a page get a page of their own. add() and load() pack
+    immediately; from_images() packs a whole set at once, tallest first,
+    which wastes less space.
+
+    Pages are opaque unless alpha=True, in which case they keep per-pixel
+    alpha. Colorkeys of the source images are not carried over.
+
+    Scaling: a region asked for at a given scale factor is scaled on its
+    own, but once share_threshold regions of a page have asked for the
+    same factor (typically a zoom level, for images drawn at the same
+    texel density) the whole page is scaled once and the regions are cut
+    from it. Scaled pages live in the atlas's own SurfaceCache, and pages
+    that would take more than a quarter of it are never scaled whole.
+    Demand is only tracked for the max_demand most recently asked for
+    (page, factor) pairs, so a continuous zoom doesn't pile it up.
+    """
+
+    def __init__(self, pagesize=(512, 512), padding=1, alpha=False,
+                 share_threshold=8, cache=None, max_demand=64):
+
+        self.pagesize = tuple(pagesize)
+        self.padding = padding
+        self.alpha = alpha
+        self.share_threshold = share_threshold
+        self.max_demand = max_demand
+
+        if cache is None:
+            cache = SurfaceCache(maxbytes=32 * 2**20)
+        self.cache = cache
+
+        self.pages = []  # : list(pg.Surface)
+        self.regions = {}  # : dict(name -> AtlasRegion)
+        self._skylines = []  # : list(list([x, y, width])), one per page
+        # : OrderedDict((page, factor) -> set(AtlasRegion)), oldest first
+        self._demand = OrderedDict()
+
+    def __len__(self):
+        return len(self.regions)
+
+    def __contains__(self, name):
+        return name in self.regions
+
+    def __getitem__(self, name):
+        return self.regions[name]
+
+    # Packing
+
+    def add(self, surface, name=None):
+        """packs surface, returns its AtlasRegion"""
+
+        pad = self.padding
+        w, h = surface.get_size()
+        pw, ph = w + 2 * pad, h + 2 * pad
+
+        for page, skyline in enumerate(self._skylines):
+            spot = _skyline_fit(skyline, pw, ph, self.pages[page].get_size())
+            if spot is not None:
+                break
+        else:
+            page = self._new_page(pw, ph)
+            spot = _skyline_fit(self._skylines[page], pw, ph,
+                                self.pages[page].get_size())
+
+        _skyline_place(self._skylines[page], spot, pw, ph)
+
+        rect = pg.Rect(spot[0] + pad, spot[1] + pad, w, h)
+        _blit_padded(self.pages[page], surface, rect, pad)
+
+        region = AtlasRegion(self, page, rect)
+        if name is not None:
+            self.regions[name] = region
+
+        return region
+
+    def load(self, imgpath):
+        """loads and packs an image file, named by its path"""
+
+        name = str(imgpath)
+
+        if name not in self.regions:
+            self.add(pg.image.load(name), name)
+
+        return self.regions[name]
+
+    def _new_page(self, w, h):
+
+        pagew, pageh = self.pagesize
+        size = (max(w, pagew), max(h, pageh))
+
+        if self.alpha:
+            surface = pg.Surface(size, pg.SRCALPHA)
+        else:
+            surface = pg.Surface(size)
+
+        self.pages.append(surface)
+        self._skylines.append([[0, 0, size[0]]])
+
+        return len(self.pages) - 1
+
+    # Scaling
+
+    def _scaled(self, region, pxsize):
+
+        w, h = region.size
+        if pxsize == (w, h):
+            return region.surface
+
+        factor = (pxsize[0] / w, pxsize[1] / h)
+        page = self.pages[region.page]
+        key = ("atlas", page, factor)
+
+        scaled = self.cache.get(key)
+
+        if scaled is None:
+
+            pagesize = (round(page.get_width() * factor[0]),
+                        round(page.get_height() * factor[1]))
+
+            if (4 * pagesize[0] * pagesize[1] * page.get_bytesize() >
+                    self.cache.maxbytes):
+                return pg.transform.scale(region.surface, pxsize)
+
+            if not self._add_demand((region.page, factor), region):
+                return pg.transform.scale(region.surface, pxsize)
+
+            scaled = pg.transform.scale(page, pagesize)
+            self.cache.put(key, scaled)
+
+        x, y = region.rect.topleft
+        rect = pg.Rect(round(x * factor[0]), round(y * factor[1]), *pxsize)
+
+        if not scaled.get_rect().contains(rect):
+            return pg.transform.scale(region.surface, pxsize)
+
+        return scaled.subsurface(rect)
+
+    def _add_demand(self, key, region):
+        """
+        records that region wants its page at key's factor; returns True
+        once enough regions have, forgetting the demand for key
+        """
+
+        demand = self._demand.get(key)
+
+        if demand is None:
+            demand = self._demand[key] = set()
+            while len(self._demand) > self.max_demand:
+                self._demand.popitem(last=False)
+        else:
+            self._demand.move_to_end(key)
+
+        demand.add(region)
+
+        if len(demand) < self.share_threshold:
+            return False
+
+        del self._demand[key]
+        return True
+
+    # Constructors
+
+    @classmethod
+    def from_images(cls, images, **kwargs):
+        """
+        atlas of images, a dict(name -> pg.Surface); regions are then
+        looked up by name
+        """
+
+        atlas = cls(**kwargs)
+
+        for name in sorted(images, key=lambda n: -images[n].get_height()):
+            atlas.add(images[name], name)
+
+        return atlas
+
+    @classmethod
+    def from_paths(cls, imgpaths, **kwargs):
+        """atlas of image files, looked up by path"""
+
+        return cls.from_images({str(p): pg.image.load(str(p))
+                                for p in imgpaths}, **kwargs)
+
+
+def _skyline_fit(skyline, w, h, pagesize):
+    """
+    (x, y, index) of the lowest, then leftmost spot for a w x h rect, or
+    None if it doesn't fit; the skyline is a list of [x, y, width]
+    segments, y growing downwards
+    """
+
+    pagew, pageh = pagesize
+    best = None
+
+    for i, (x, _, _) in enumerate(skyline):
+
+        if x + w > pagew:
+            break
+
+        # the rect rests on the highest segment it spans
+        y = 0
+        reach = x + w
+        for sx, sy, sw in skyline[i:]:
+            if sx >= reach:
+                break
+            y = max(y, sy)
+
+        if y + h <= pageh and (best is None or y < best[1]):
+            best = (x, y, i)
+
+    return best
+
+
+def _skyline_place(skyline, spot, w, h):
+
+    x, y, i = spot
+    reach = x + w
+
+    # segments fully under the new rect disappear, the last one is cut
+    j = i
+    while j < len(skyline) and skyline[j][0] < reach:
+        sx, sy, sw = skyline[j]
+        if sx + sw > reach:
+            skyline[j] = [reach, sy, sx + sw - reach]
+            break
+        j += 1
+
+    skyline[i:j] = [[x, y + h, w]]
+
+    # merge neighbours of equal height
+    k = 0
+    while k < len(skyline) - 1:
+        if skyline[k][1] == skyline[k + 1][1]:
+            skyline[k][2] += skyline.pop(k + 1)[2]
+        else:
+            k += 1
+
+
+def _blit_padded(page, surface, rect, pad):
+    """blits surface at rect, with its edge pixels repeated pad times"""
+
+    if pad:
+
+        w, h = rect.size
+        edges = [((0, 0, 1, h), (-1, 0)), ((w - 1, 0, 1, h), (1, 0)),
+                 ((0, 0, w, 1), (0, -1)), ((0, h - 1, w, 1), (0, 1))]
+
+        for area, (dx, dy) in edges:
+            strip = surface.subsurface(area)
+            target = pg.Rect(area).move(rect.topleft)
+            for k in range(1, pad + 1):
+                _copy(page, strip, target.move(dx * k, dy * k))
+
+        corners = [(0, 0, -1, -1), (w - 1, 0, 1, -1),
+                   (0, h - 1, -1, 1), (w - 1, h - 1, 1, 1)]
+
+        for x, y, dx, dy in corners:
+            color = surface.get_at((x, y))
+            corner = pg.Rect(rect.x + x + (dx < 0) * -pad + (dx > 0),
+                             rect.y + y + (dy < 0) * -pad + (dy > 0),
+                             pad, pad)
+            page.fill(color, corner)
+
+    _copy(page, surface, rect)
+
+
+def _copy(page, surface, pos):
+    """blits surface onto an untouched area of page, alpha included"""
+
+    # adding onto the page's zeroed pixels copies them without blending
+    page.blit(surface, pos, special_flags=pg.BLEND_RGBA_ADD)
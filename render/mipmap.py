@@ -0,0 +1,110 @@
+import threading
+
+import pygame as pg
+
+
+class MipSurface:
+    """
+    Chain of pre-scaled copies of a surface, one per power-of-two zoom
+
+    Level k holds the surface at the pixel size a sprite of world size
+    size has under a camera of scale scale * 2 ** k, computed the same way
+    Camera.px_size does. As long as the camera zooms in powers of two
+    around scale, every zoom step then finds its surface ready-made.
+    Other sizes are scaled from the nearest level above them (or the
+    largest level), rather than from the original surface.
+
+    With background=True the levels are built on a worker thread, nearest
+    to level 0 first; until a level is ready, lookups fall back to the
+    levels that are, which are blurrier when smaller than the size asked
+    for. ready only becomes True once every level is built.
+    """
+
+    def __init__(self, surface, size, scale, levels=range(-3, 4),
+                 background=False):
+
+        self.source = surface
+        self.size = tuple(size)
+        self.scale = float(scale)
+        self.levels = sorted(levels, key=abs)
+
+        self._surfaces = {}  # : dict((int, int) -> pg.Surface), by pxsize
+        self._thread = None
+
+        if background:
+            # the worker scales its own copy, as get() may be scaling the
+            # source on the main thread at the same time
+            self._thread = threading.Thread(target=self._build_levels,
+                                            args=(surface.copy(),),
+                                            daemon=True)
+            self._thread.start()
+        else:
+            self._build_levels(surface)
+
+    # Properties
+
+    @property
+    def ready(self):
+        """True once every level has been built"""
+        return self._thread is None or not self._thread.is_alive()
+
+    @property
+    def pxsizes(self):
+        return sorted(self._surfaces)
+
+    # Methods
+
+    def wait(self, timeout=None):
+        """blocks until background building is done"""
+
+        if self._thread is not None:
+            self._thread.join(timeout)
+
+    def level_pxsize(self, level):
+
+        scale = self.scale * 2 ** level
+        return (int(self.size[0] * scale), int(self.size[1] * scale))
+
+    def get(self, pxsize):
+        """
+        surface of pixel size pxsize
+
+        The returned surface may be one of the levels themselves, so it
+        mustn't be modified; copy it first if needed.
+        """
+
+        pxsize = tuple(pxsize)
+        surface = self._surfaces.get(pxsize)
+
+        if surface is not None:
+            return surface
+
+        return pg.transform.scale(self._nearest(pxsize), pxsize)
+
+    def _nearest(self, pxsize):
+        """smallest ready level at least as large as pxsize, else largest"""
+
+        best = None
+
+        for size in list(self._surfaces):
+            if size[0] >= pxsize[0] and size[1] >= pxsize[1]:
+                if best is None or size < best:
+                    best = size
+
+        if best is None:
+            sizes = list(self._surfaces)
+            if not sizes:
+                return self.source
+            best = max(sizes)
+
+        return self._surfaces[best]
+
+    def _build_levels(self, source):
+
+        for level in self.levels:
+
+            pxsize = self.level_pxsize(level)
+            if pxsize[0] <= 0 or pxsize[1] <= 0 or pxsize in self._surfaces:
+                continue
+
+            self._surfaces[pxsize] = pg.transform.scale(source, pxsize)
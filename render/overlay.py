@@ -0,0 +1,85 @@
+import time
+
+import pygame as pg
+
+import render
+
+
+class ProfilerOverlay(render.Renderable):
+    """
+    Panel showing a Profiler's rolling phase timings and counters
+
+    Add it to a RenderManager after the scene so it's drawn on top. The
+    text is only re-rendered every refresh seconds. The panel is opaque
+    and never shrinks, so it always covers what it drew before, even
+    when the scene below only repaints its dirty regions.
+    """
+
+    def __init__(self, profiler, pos=(8, 8), fontsize=16,
+                 color=(255, 255, 255), bg=(0, 0, 0), refresh=0.25):
+
+        self.profiler = profiler
+        self.pos = pos
+        self.fontsize = fontsize
+        self.color = color
+        self.bg = bg
+        self.refresh = refresh
+        self.visible = True
+
+        self._font = None
+        self._panel = None
+        self._rendered = 0.
+        self._size = (0, 0)
+
+    def lines(self):
+
+        lines = [f"{'phase':<14}{'p50':>7}{'p95':>7}{'p99':>7}  ms"]
+
+        for name, s in sorted(self.profiler.stats().items()):
+            lines.append(f"{name:<14}{s['p50']:>7.2f}{s['p95']:>7.2f}"
+                         f"{s['p99']:>7.2f}")
+
+        for name, c in sorted(self.profiler.counters().items()):
+            lines.append(f"{name:<14}{c['mean']:>7.1f}{c['max']:>7}"
+                         "  /frame")
+
+        return lines
+
+    def draw(self, screen):
+
+        if not self.visible:
+            return []
+
+        now = time.perf_counter()
+
+        if self._panel is None or now - self._rendered >= self.refresh:
+            self._panel = self._render_panel()
+            self._rendered = now
+
+        screen.blit(self._panel, self.pos)
+
+        return [pg.Rect(self.pos, self._panel.get_size())]
+
+    def _render_panel(self):
+
+        if self._font is None:
+            if not pg.font.get_init():
+                pg.font.init()
+            self._font = pg.font.SysFont("monospace", self.fontsize)
+
+        texts = [self._font.render(line, True, self.color, self.bg)
+                 for line in self.lines()]
+
+        w = max(t.get_width() for t in texts) + 8
+        h = sum(t.get_height() for t in texts) + 8
+        self._size = (max(w, self._size[0]), max(h, self._size[1]))
+
+        panel = pg.Surface(self._size)
+        panel.fill(self.bg)
+
+        y = 4
+        for t in texts:
+            panel.blit(t, (4, y))
+            y += t.get_height()
+
+        return panel
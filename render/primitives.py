@@ -0,0 +1,49 @@
+import pygame as pg
+from collections import namedtuple
+
+
+class Primitive(namedtuple("Primitive", ["shape", "color", "size"])):
+    """
+    Solid rect or ellipse of a given pixel size, standing in for a sprite
+    surface; drawn with pg.draw or fill, so no surface is ever made
+    """
+
+    def get_size(self):
+        return self.size
+
+    def draw(self, target, pos):
+
+        if not (self.size[0] and self.size[1]):
+            return
+
+        rect = pg.Rect(pos, self.size)
+
+        if self.shape == "rect":
+            # fill() doesn't shrink rects hanging off the left or top edge
+            target.fill(self.color, rect.clip(target.get_clip()))
+        else:
+            pg.draw.ellipse(target, self.color, rect)
+
+
+def draw_items(target, items):
+    """
+    draws (surface or Primitive, position) pairs in order: runs of
+    surfaces go through a single blits() call, primitives in between
+    are drawn directly; returns the number of items drawn
+    """
+
+    run = []
+
+    for sf, pos in items:
+        if isinstance(sf, Primitive):
+            if run:
+                target.blits(blit_sequence=run, doreturn=False)
+                run = []
+            sf.draw(target, pos)
+        else:
+            run.append((sf, pos))
+
+    if run:
+        target.blits(blit_sequence=run, doreturn=False)
+
+    return len(items)
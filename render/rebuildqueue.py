@@ -0,0 +1,91 @@
+import time
+
+
+class RebuildQueue:
+    """
+    Spreads sprite surface rebuilds over several frames
+
+    When the camera zooms or many sprites change angle at once, every
+    sprite's surface goes stale in the same frame. Given the sprites to
+    draw, surfaces() spends at most budget_ms milliseconds (plus one
+    rebuild) scaling them per frame. The first quarter rebuilds stale
+    sprites nearest to the camera's center first. The rest stretches the
+    others' previous surfaces to their new size as placeholders (kept for
+    later frames while the size holds), and any time left rebuilds more.
+    Sprites still without a placeholder when the time is up are drawn with
+    their previous surface cut down to the new size, so that nothing
+    spills over its neighbours. Sprites with no previous surface are
+    always built straight away.
+
+    rebuilt and deferred count what happened in the last frame.
+    """
+
+    def __init__(self, budget_ms=2.0):
+
+        self.budget_ms = budget_ms
+        self.rebuilt = 0
+        self.deferred = 0
+
+    def surfaces(self, sprites, camera, cache=None):
+        """surface to blit for each sprite, rebuilding within budget"""
+
+        out = [None] * len(sprites)
+        pending = []  # : list((squared distance to the camera, index))
+        cx, cy = camera.center
+        current = {}  # : dict(int -> (key, pxsize, angle)) of pending
+
+        for i, sprite in enumerate(sprites):
+            cur = sprite._current_key(camera, cache)
+            if sprite._try_cached(camera, cache, cur):
+                out[i] = sprite._cached_surface
+            else:
+                rect = sprite.rect
+                pending.append(((rect.cx - cx)**2 + (rect.cy - cy)**2, i))
+                current[i] = cur
+
+        self.rebuilt = 0
+        self.deferred = 0
+
+        if not pending:
+            return out
+
+        pending.sort()
+
+        start = time.perf_counter()
+        deadline = start + self.budget_ms / 1000
+        placeholders = start + self.budget_ms / 1000 / 4  # then stretch
+        later = []
+
+        for _, i in pending:
+
+            sprite = sprites[i]
+
+            if sprite._try_cached(camera, cache, current[i]):
+                out[i] = sprite._cached_surface  # built for another sprite
+            elif (not self.rebuilt or sprite._cached_surface is None or
+                    time.perf_counter() < placeholders):
+                sprite._update_cached(camera, cache=cache)
+                out[i] = sprite._cached_surface
+                self.rebuilt += 1
+            else:
+                later.append(i)
+
+        for i in later:
+            out[i] = sprites[i]._stretched_surface(
+                current[i][1], scale=time.perf_counter() < deadline)
+
+        # any time left (e.g. placeholders stretched in an earlier frame
+        # were reused) goes to more rebuilds
+        for n, i in enumerate(later):
+
+            if time.perf_counter() >= deadline:
+                self.deferred = len(later) - n
+                break
+
+            sprite = sprites[i]
+            if not sprite._try_cached(camera, cache, current[i]):
+                sprite._update_cached(camera, cache=cache)
+                self.rebuilt += 1
+            out[i] = sprite._cached_surface
+
+        return out
@@ -1,21 +1,85 @@
 import pygame as pg
 import numpy as np
+from bisect import bisect_left, bisect_right
 from collections import namedtuple
+from functools import lru_cache
 from warnings import warn
 
 import render
 import utils.floatshapes as fs
+from render.atlas import AtlasRegion
+from render.mipmap import MipSurface
+from render.primitives import Primitive, draw_items
+from render.rebuildqueue import RebuildQueue
+from render.staticlayer import StaticLayer
+from render.surfacecache import SurfaceCache
+from utils.spatialhash import SpatialHash
 
 
 class Scene(render.Renderable):
-    """Main class for organising rendering of 2D scenes"""
+    """
+    Main class for organising rendering of 2D scenes
+
+    Sprites are kept in a spatial index of their bounding rects, updated
+    whenever a sprite's rect or angle changes, so drawing only has to look
+    at the sprites near the camera's frame. cellsize is the size of the
+    index's grid cells in world units. They are also kept sorted by z,
+    then by order of addition, updated whenever a sprite is added,
+    removed or its z changes, so frames don't need a full sort.
+
+    Scaled and rotated sprite surfaces go through surface_cache, shared
+    by all sprites of the scene (and possibly other scenes).
+
+    If rebuild_budget_ms is given, rebuilding stale sprite surfaces (e.g.
+    after a zoom) is spread over frames by a RebuildQueue, spending at
+    most about that long per frame; otherwise they are all rebuilt in
+    the frame they go stale.
+
+    With dirty_rects=True, draw() only repaints the regions of the screen
+    where sprites moved, changed, appeared or disappeared since the last
+    frame, and returns those regions for pg.display.update(). Any camera
+    movement or zoom, or dirty regions covering more than
+    full_redraw_fraction of the screen, fall back to a full redraw.
+
+    Sprites added with static=True (walls, scenery) go to static_layer
+    instead, which bakes them into chunks of static_chunk_px pixels drawn
+    below every other sprite. They are only redrawn when one of them is
+    added, removed, moved or refreshed with refresh_sprite().
+    """
 
-    def __init__(self, camera, bg=(255, 0, 255)):
+    def __init__(self, camera, bg=(255, 0, 255), cellsize=4.0,
+                 surface_cache=None, rebuild_budget_ms=None,
+                 dirty_rects=False, full_redraw_fraction=0.5,
+                 static_chunk_px=512):
 
         self._bg = bg
         self._camera = camera
 
+        if surface_cache is None:
+            surface_cache = SurfaceCache()
+        self.surface_cache = surface_cache
+
+        if rebuild_budget_ms is None:
+            self.rebuild_queue = None
+        else:
+            self.rebuild_queue = RebuildQueue(rebuild_budget_ms)
+
+        self.dirty_rects = dirty_rects
+        self.full_redraw_fraction = full_redraw_fraction
+        self._drawn = None  # : dict(Sprite/chunk -> (surface, pg.Rect, z))
+        self._camstate = None
+        self.blits = 0  # : surfaces and primitives drawn in the last frame
+
         self.sprites = []
+        self._index = SpatialHash(cellsize)
+        self._nextorder = 0
+
+        # draw order: sprites sorted by (z, insertion order)
+        self._zkeys = {}  # : dict(Sprite -> (z, int))
+        self._zorder = []  # : list((z, int)), sorted
+        self._zsprites = []  # : list(Sprite), in the same order
+
+        self.static_layer = StaticLayer(bg, static_chunk_px, cellsize=cellsize)
 
     @property
     def camera(self):
@@ -25,8 +89,91 @@ class Scene(render.Renderable):
     def bg(self):
         return self._bg
 
-    def add_sprite(self, s):
-        self.sprites.append(s)
+    def add_sprite(self, s, static=False):
+
+        if self in s._scenes:
+            raise ValueError("sprite is already in this scene")
+
+        if static:
+            self.static_layer.add(s)
+        else:
+            self.sprites.append(s)
+            self._index.insert(s, s.get_bounding_rect())
+            self._zinsert(s, (s.z, self._nextorder))
+            self._nextorder += 1
+
+        s._scenes.append(self)
+
+    def remove_sprite(self, s):
+
+        if self not in s._scenes:
+            raise ValueError("sprite is not in this scene")
+
+        if s in self.static_layer:
+            self.static_layer.remove(s)
+        else:
+            self.sprites.remove(s)
+            self._index.remove(s)
+            self._zremove(s)
+
+        s._scenes.remove(self)
+
+    def refresh_sprite(self, s):
+        """
+        call after changing how a static sprite looks (surface, colour,
+        alpha, visible) so that it is baked again; other sprites are
+        picked up on their own
+        """
+
+        if s in self.static_layer:
+            self.static_layer.refresh(s)
+
+    def visible_sprites(self):
+        """visible sprites overlapping the camera's frame, in draw order"""
+
+        found = self._index.query(self._camera.frame)
+
+        # walking the whole draw order beats sorting a large share of it
+        if 8 * len(found) > len(self._zsprites):
+            return [s for s in self._zsprites if s in found and s.visible]
+
+        return sorted((s for s in found if s.visible),
+                      key=self._zkeys.__getitem__)
+
+    def _sprite_moved(self, s):
+
+        if s in self.static_layer:
+            self.static_layer.move(s)
+        else:
+            self._index.update(s, s.get_bounding_rect())
+
+    def _sprite_restacked(self, s):
+
+        if s in self.static_layer:
+            self.static_layer.refresh(s)
+        else:
+            order = self._zremove(s)[1]
+            self._zinsert(s, (s.z, order))
+
+    def _zinsert(self, s, key):
+
+        i = bisect_right(self._zorder, key)
+        self._zorder.insert(i, key)
+        self._zsprites.insert(i, s)
+        self._zkeys[s] = key
+
+    def _zremove(self, s):
+
+        key = self._zkeys.pop(s)
+        i = bisect_left(self._zorder, key)
+        del self._zorder[i]
+        del self._zsprites[i]
+
+        return key
+
+    def invalidate(self):
+        """forces a full redraw on the next frame in dirty_rects mode"""
+        self._drawn = None
 
     def draw(self, screen):
 
@@ -34,17 +181,126 @@ class Scene(render.Renderable):
             warn("screen size not compatible with camera; "
                  "there may be unexpected behaviour")
 
+        chunks = self.static_layer.blits(self._camera, self.surface_cache)
+        sprites = self.visible_sprites()
+
+        keys = [key for key, _, _ in chunks] + sprites
+        blits = [(sf, pos) for _, sf, pos in chunks] + self._get_blits(sprites)
+
+        if self.dirty_rects:
+            zs = [None] * len(chunks) + [sprite.z for sprite in sprites]
+            return self._draw_dirty(screen, keys, zs, blits)
+
         screen.fill(self._bg)
+        self.blits = draw_items(screen, blits)
+
+    def _get_blits(self, sprites):
+        """
+        (surface, pixel position) for each sprite; solid primitives give a
+        Primitive instead of a surface, drawn straight onto the screen
+        """
+
+        if not sprites:
+            return []
 
         cam = self.camera
 
-        self.sprites.sort(key=lambda s: s.z)
+        bounds = [sprite.get_bounding_rect() for sprite in sprites]
+        corners = np.array([(r.left, r.top) for r in bounds])
 
-        blits = [(sprite.get_resized_surface(cam),
-                  cam.px_point(sprite.get_bounding_rect().topleft))
-                 for sprite in self.sprites
-                 if sprite.visible and cam.inframe(sprite.rect)]
-        screen.blits(blit_sequence=blits)
+        cache = self.surface_cache
+
+        prims = [sprite._primitive(cam, cache) for sprite in sprites]
+        others = [sprite for sprite, prim in zip(sprites, prims)
+                  if prim is None]
+
+        if self.rebuild_queue is None:
+            surfaces = [sprite.get_resized_surface(cam, cache=cache)
+                        for sprite in others]
+        else:
+            surfaces = self.rebuild_queue.surfaces(others, cam, cache)
+
+        surfaces = iter(surfaces)
+        surfaces = [next(surfaces) if prim is None else prim
+                    for prim in prims]
+
+        return list(zip(surfaces,
+                        map(tuple, cam.px_points(corners).tolist())))
+
+    def _draw_dirty(self, screen, keys, zs, blits):
+
+        cam = self.camera
+        screenrect = screen.get_rect()
+        camstate = (float(cam.center[0]), float(cam.center[1]),
+                    cam.scale, screenrect.size)
+
+        rects = [pg.Rect(pos, sf.get_size()) for sf, pos in blits]
+        drawn = {key: (sf, rect, z)
+                 for key, z, (sf, _), rect in zip(keys, zs, blits, rects)}
+
+        prev, self._drawn = self._drawn, drawn
+        full = prev is None or camstate != self._camstate
+        self._camstate = camstate
+
+        if not full:
+
+            dirty = []
+
+            for key, state in drawn.items():
+                old = prev.get(key)
+                if old is None:
+                    dirty.append(state[1])
+                elif (old[0] != state[0] or old[1] != state[1] or
+                        old[2] != state[2]):
+                    dirty.append(old[1])
+                    dirty.append(state[1])
+
+            for key, old in prev.items():
+                if key not in drawn:
+                    dirty.append(old[1])
+
+            dirty = _merge_rects([r.clip(screenrect) for r in dirty if
+                                  r.colliderect(screenrect)])
+
+            area = sum(r.w * r.h for r in dirty)
+            full = area > self.full_redraw_fraction * screenrect.w * screenrect.h
+
+        if full:
+            screen.fill(self._bg)
+            self.blits = draw_items(screen, blits)
+            return [screenrect]
+
+        clip = screen.get_clip()
+        self.blits = 0
+
+        for d in dirty:
+            screen.set_clip(d)
+            screen.fill(self._bg)
+            self.blits += draw_items(
+                screen, [blits[i] for i in d.collidelistall(rects)])
+
+        screen.set_clip(clip)
+
+        return dirty
+
+
+def _merge_rects(rects):
+    """merges overlapping pg.Rects until none overlap"""
+
+    merged = []
+
+    for r in rects:
+
+        r = r.copy()
+        i = r.collidelist(merged)
+
+        while i != -1:
+            r.union_ip(merged.pop(i))
+            i = r.collidelist(merged)
+
+        merged.append(r)
+
+    return merged
 
 
 class Camera:
@@ -64,7 +320,7 @@ class Camera:
 
     @property
     def frame(self):
-        w, h = self.px_size(self.screensize)
+        w, h = self.pos_size(self.screensize)
         return fs.FloatRect.from_center(*self.center, w, h)
 
     # Methods
@@ -85,6 +341,32 @@ class Camera:
         return (self.screensize[0] / 2 + int(newpoint[0]),
                 self.screensize[1] / 2 - int(newpoint[1]))
 
+    def px_points(self, points):
+        """
+        Vectorized px_point: (N, 2) array of points -> (N, 2) int array
+        """
+
+        points = np.asarray(points, float).reshape(-1, 2)
+
+        newpoints = np.trunc((points - self.center) * self.scale)
+        newpoints[:, 1] *= -1
+        newpoints += (self.screensize[0] / 2, self.screensize[1] / 2)
+
+        return newpoints.astype(int)
+
+    def px_rects(self, frects):
+        """
+        Vectorized px_rect for a FloatRectArray
+
+        returns (N, 4) int array of (x, y, width, height) rows
+        """
+
+        out = np.empty((len(frects), 4), int)
+        out[:, :2] = self.px_points(frects.topleft)
+        out[:, 2:] = np.trunc(frects.size * self.scale)
+
+        return out
+
     def px_length(self, length):
         return int(length * self.scale)
 
@@ -119,22 +401,73 @@ class Sprite:
     """
     Basic movable, scalable, rotatable screen element
 
-    Has basic caching to avoid scaling and 
+    surface is a pg.Surface, a MipSurface to pick pre-scaled levels
+    rather than scaling the source on every zoom change, or an
+    AtlasRegion to draw an image packed in an Atlas.
+
+    The scaled and rotated surface is cached, and only rebuilt when the
+    source surface, pixel size, angle or alpha change. When drawn by a
+    Scene, the surfaces come from the scene's SurfaceCache, so sprites
+    which look the same share one surface.
+
+    rotation_steps: int or None. If set, the angle is snapped to that many
+        steps per turn, and the first time a step is needed the surface
+        is rendered at every step at once into the cache, so spinning
+        sprites never rotate surfaces frame to frame. Bounding rects then
+        come from a precomputed table rather than rotating corners.
     """
 
-    def __init__(self, surface, rect, alpha=None, z=0.0, angle=0, visible=True):
+    def __init__(self, surface, rect, alpha=None, z=0.0, angle=0, visible=True,
+                 rotation_steps=None):
+
+        self._scenes = []  # : scenes indexing this sprite
+        self.rotation_steps = rotation_steps
 
         self.rect = rect
         self.surface = surface
-        self.z = z
+        self._z = z
         self.angle = angle
         self.visible = visible
         self.alpha = alpha
 
-        self._pointer_prev_surface = surface
         self._cached_surface = None
-        self._cached_scale = None
-        self._cached_angle = None
+        self._cached_key = None
+        self._cached_pxsize = None
+        # : (pxsize, stale, surface, stretched or cut), see below
+        self._stretched = None
+
+    @property
+    def rect(self):
+        return self._rect
+
+    @rect.setter
+    def rect(self, value):
+
+        self._rect = value
+        for scene in self._scenes:
+            scene._sprite_moved(self)
+
+    @property
+    def z(self):
+        return self._z
+
+    @z.setter
+    def z(self, value):
+
+        self._z = value
+        for scene in self._scenes:
+            scene._sprite_restacked(self)
+
+    @property
+    def angle(self):
+        return self._angle
+
+    @angle.setter
+    def angle(self, value):
+
+        self._angle = value
+        for scene in self._scenes:
+            scene._sprite_moved(self)
 
     @property
     def pos(self):
@@ -172,40 +505,202 @@ class Sprite:
 
         if self.angle == 0:
             return rect
-        else:
-            return rect.rotated_bounds(self.angle)
 
-    def get_resized_surface(self, camera, update=True):
+        if self.rotation_steps:
+
+            c, s = _rotation_factors(self.rotation_steps)[
+                self._rotation_step()]
+            w, h = rect.width, rect.height
+
+            return fs.FloatRect.from_center(rect.cx, rect.cy,
+                                            c * w + s * h, s * w + c * h)
+
+        return rect.rotated_bounds(self.angle)
+
+    def _rotation_step(self):
+        """index of the step nearest to angle, if rotation_steps is set"""
+
+        n = self.rotation_steps
+        return round(self.angle * n / 360) % n
+
+    def _effective_angle(self, cache=None):
+        """angle the surface is actually drawn at"""
+
+        if self.rotation_steps:
+            return self._rotation_step() * 360 / self.rotation_steps
+
+        if cache is not None:
+            return cache.quantise_angle(self.angle)
+
+        return self.angle
+
+    def _primitive(self, camera, cache=None):
+        """Primitive to draw instead of a surface, if there is one"""
+        return None
+
+    def get_resized_surface(self, camera, update=True, cache=None):
 
         if update:
-            self._update_cached(camera)
+            self._update_cached(camera, cache=cache)
 
         return self._cached_surface
 
-    def _update_cached(self, camera, force=False):
+    def _current_key(self, camera, cache=None):
+        """(key, pxsize, angle) the cached surface should have for camera"""
 
-        sf, angle, alpha = self.surface, self.angle, self.alpha
+        pxsize = camera.px_size(self.rect.size)
+        angle = self._effective_angle(cache)
 
-        if not force and (self._pointer_prev_surface == sf and
-                          self._cached_angle == angle and
-                          self._cached_scale == camera.scale):
-            return  # if surface nor angle changed and scale is still
-            # compatible with camera, no need to update
+        return self._cache_key(pxsize, angle), pxsize, angle
 
-        pxsize = camera.px_size(self.rect.size)
-        self._cached_surface = pg.transform.scale(sf, pxsize)
+    def _try_cached(self, camera, cache=None, current=None):
+        """
+        brings the cached surface up to date without building anything;
+        returns False if a rebuild is needed. current is what
+        _current_key() returns, if already known.
+        """
+
+        if current is None:
+            current = self._current_key(camera, cache)
+        key, pxsize, _ = current
+
+        if key == self._cached_key:
+            return True
+
+        if cache is not None and key in cache:
+            self._cached_surface = cache.get(key)
+            self._cached_key = key
+            self._cached_pxsize = pxsize
+            return True
+
+        return False
+
+    def _update_cached(self, camera, force=False, cache=None):
+
+        key, pxsize, angle = self._current_key(camera, cache)
+
+        if not force and key == self._cached_key:
+            return  # nothing that affects the surface has changed
+
+        def build():
+            sf = self._build_surface(pxsize, angle)
+            if self.alpha is not None:
+                sf.set_alpha(self.alpha)
+            return sf
+
+        if cache is None or force:
+            self._cached_surface = build()
+            if cache is not None:
+                cache.put(key, self._cached_surface)
+        elif self.rotation_steps:
+            self._cached_surface = cache.get(key)
+            if self._cached_surface is None:
+                self._cached_surface = self._build_sheet(pxsize, angle, cache)
+        else:
+            self._cached_surface = cache.get_or_build(key, build)
+
+        self._cached_key = key
+        self._cached_pxsize = pxsize
+        self._stretched = None
+
+    def _stretched_surface(self, pxsize, scale=True):
+        """
+        stale cached surface, stretched to pixel size pxsize
+
+        If not scale, the stale surface is cut down to the new size
+        instead, without copying, so that it doesn't spill over its
+        neighbours. Either is kept while pxsize and the stale surface stay
+        the same, a cut one until it can be stretched.
+        """
+
+        stale = self._cached_surface
+        oldw, oldh = self._cached_pxsize
+        neww, newh = pxsize
+
+        if (neww, newh) == (oldw, oldh) or not (oldw and oldh):
+            return stale
+
+        kept = self._stretched
+        if kept is not None and kept[0] == pxsize and kept[1] is stale and \
+                (kept[3] or not scale):
+            return kept[2]
+
+        w, h = stale.get_size()
+        target = (max(1, int(w * neww / oldw)), max(1, int(h * newh / oldh)))
+
+        if scale:
+            sf = pg.transform.scale(stale, target)
+        else:
+            sf = _clipped(stale, target)
+
+        self._stretched = (pxsize, stale, sf, scale)
+
+        return sf
+
+    def _build_sheet(self, pxsize, angle, cache):
+        """
+        renders every rotation step into cache, returns the one for angle
+        """
+
+        n = self.rotation_steps
+        base = self._build_surface(pxsize, 0)
+        wanted = None
+
+        for k in range(n):
+
+            stepangle = k * 360 / n
+            sf = base if k == 0 else pg.transform.rotate(base, stepangle)
+
+            if self.alpha is not None:
+                sf.set_alpha(self.alpha)
+
+            cache.put(self._cache_key(pxsize, stepangle), sf)
+
+            if stepangle == angle:
+                wanted = sf
+
+        return wanted
+
+    def _cache_key(self, pxsize, angle):
+
+        surface = self.surface
+
+        # until its levels are built, a MipSurface may fall back to a
+        # blurrier one; keep that apart so it's replaced once they're ready
+        if isinstance(surface, MipSurface) and not surface.ready:
+            return ("surface", surface, pxsize, angle, self.alpha, "partial")
+
+        return ("surface", surface, pxsize, angle, self.alpha)
+
+    def _build_surface(self, pxsize, angle):
+
+        if isinstance(self.surface, MipSurface):
+            sf = self.surface.get(pxsize)
+            if angle == 0 and self.alpha is not None:
+                sf = sf.copy()  # don't set alpha on the mip level itself
+        elif isinstance(self.surface, AtlasRegion):
+            sf = self.surface.scaled(pxsize)
+            if sf is self.surface.surface and angle == 0 and \
+                    self.alpha is not None:
+                sf = sf.copy()
+        else:
+            sf = pg.transform.scale(self.surface, pxsize)
 
         if angle != 0:
-            self._cached_surface = pg.transform.rotate(
-                self._cached_surface, angle)
+            sf = pg.transform.rotate(sf, angle)
 
-        if alpha is not None:
-            self._cached_surface.set_alpha(alpha)
+        return sf
 
     # Constructors
 
     @classmethod
-    def from_imgpath(self, imgpath, rect, z=0.0, angle=0, visible=True):
+    def from_imgpath(self, imgpath, rect, z=0.0, angle=0, visible=True,
+                     atlas=None):
+        """if atlas is given, the image is packed in it (once per path)"""
+
+        if atlas is not None:
+            return Sprite(atlas.load(imgpath), rect, z=z, angle=angle,
+                          visible=visible)
 
         surf = pg.image.load(str(imgpath))
         surf.convert()
@@ -214,22 +709,30 @@ class Sprite:
 
 
 class SpriteCircle(Sprite):
+    """
+    Solid ellipse filling rect; drawn straight onto the screen with
+    pg.draw unless alpha or rotation needs a surface
+    """
 
-    def __init__(self, color, rect, alpha=None, z=0.0, angle=0, visible=True):
+    def __init__(self, color, rect, alpha=None, z=0.0, angle=0, visible=True,
+                 rotation_steps=None):
 
-        super().__init__(None, rect, alpha=alpha, z=z, angle=angle, visible=visible)
+        super().__init__(None, rect, alpha=alpha, z=z, angle=angle,
+                         visible=visible, rotation_steps=rotation_steps)
         self.color = color
 
-    def _update_cached(self, camera, force=False):
+    def _cache_key(self, pxsize, angle):
+        return ("circle", tuple(self.color), pxsize, angle, self.alpha)
 
-        angle, alpha, color = self.angle, self.alpha, self.color
+    def _primitive(self, camera, cache=None):
 
-        if not force and (self._cached_angle == angle and
-                          self._cached_scale == camera.scale):
-            return  # if surface nor angle changed and scale is still
-            # compatible with camera, no need to update
+        if self.alpha is None and self._effective_angle(cache) == 0:
+            return Primitive("ellipse", tuple(self.color),
+                              camera.px_size(self.rect.size))
 
-        pxsize = camera.px_size(self.rect.size)
+    def _build_surface(self, pxsize, angle):
+
+        color = self.color
         sf = pg.Surface(pxsize)
 
         if color == (0, 0, 0):
@@ -240,45 +743,71 @@ class SpriteCircle(Sprite):
 
         pg.draw.ellipse(sf, color, pg.Rect((0, 0), pxsize))
 
-        if angle == 0:
-            self._cached_surface = sf
-        else:
-            self._cached_surface = pg.transform.rotate(sf, angle)
+        if angle != 0:
+            sf = pg.transform.rotate(sf, angle)
 
-        if alpha is not None:
-            self._cached_surface.set_alpha(alpha)
+        return sf
 
     @classmethod
-    def from_circle(cls, color, circle, alpha=None, z=0.0, angle=0, visible=True):
+    def from_circle(cls, color, circle, alpha=None, z=0.0, angle=0, visible=True,
+                    rotation_steps=None):
 
         diam = circle.diameter
         rect = fs.FloatRect.from_center(circle.cx, circle.cy, diam, diam)
-        return cls(color, rect, alpha=alpha, z=z, angle=angle, visible=visible)
+        return cls(color, rect, alpha=alpha, z=z, angle=angle, visible=visible,
+                   rotation_steps=rotation_steps)
 
 
 class SpriteRect(Sprite):
+    """
+    Solid rectangle; filled straight onto the screen unless alpha or
+    rotation needs a surface
+    """
 
-    def __init__(self, color, rect, alpha=None, z=0.0, angle=0, visible=True):
+    def __init__(self, color, rect, alpha=None, z=0.0, angle=0, visible=True,
+                 rotation_steps=None):
 
-        super().__init__(None, rect, alpha=alpha, z=z, angle=angle, visible=visible)
+        super().__init__(None, rect, alpha=alpha, z=z, angle=angle,
+                         visible=visible, rotation_steps=rotation_steps)
         self.color = color
 
-    def _update_cached(self, camera, force=False):
+    def _cache_key(self, pxsize, angle):
+        return ("rect", tuple(self.color), pxsize, angle, self.alpha)
 
-        angle, alpha, color = self.angle, self.alpha, self.color
+    def _primitive(self, camera, cache=None):
 
-        if not force and (self._cached_angle == angle and
-                          self._cached_scale == camera.scale):
-            return
+        if self.alpha is None and self._effective_angle(cache) == 0:
+            return Primitive("rect", tuple(self.color),
+                              camera.px_size(self.rect.size))
+
+    def _build_surface(self, pxsize, angle):
 
-        pxsize = camera.px_size(self.rect.size)
         sf = pg.Surface(pxsize)
-        sf.fill(color)
+        sf.fill(self.color)
 
-        if angle == 0:
-            self._cached_surface = sf
-        else:
-            self._cached_surface = pg.transform.rotate(sf, angle)
+        if angle != 0:
+            sf = pg.transform.rotate(sf, angle)
+
+        return sf
+
+
+@lru_cache(maxsize=None)
+def _rotation_factors(steps):
+    """(|cos|, |sin|) of every rotation step, for bounding rects"""
+
+    angles = np.arange(steps) * (2 * np.pi / steps)
+    return tuple(zip(np.abs(np.cos(angles)).tolist(),
+                     np.abs(np.sin(angles)).tolist()))
+
+
+def _clipped(surface, size):
+    """surface cut down to at most size, sharing its pixels"""
+
+    w, h = surface.get_size()
+    if w <= size[0] and h <= size[1]:
+        return surface
+
+    clipped = surface.subsurface((0, 0, min(w, size[0]), min(h, size[1])))
+    clipped.set_alpha(surface.get_alpha())  # not inherited by subsurfaces
 
-        if alpha is not None:
-            self._cached_surface.set_alpha(alpha)
+    return clipped
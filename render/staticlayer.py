@@ -0,0 +1,192 @@
+import math
+import pygame as pg
+from collections import OrderedDict
+
+import utils.floatshapes as fs
+from render.primitives import draw_items
+from utils.spatialhash import SpatialHash
+
+
+class StaticLayer:
+    """
+    Sprites which never move, pre-drawn into chunks of chunk_px pixels
+
+    The world is cut into square chunks of chunk_px pixels at the camera's
+    scale. The first time a chunk is visible at a given scale, every
+    static sprite overlapping it is drawn once onto an opaque surface
+    filled with the background colour; later frames only blit the chunk.
+    Chunks are keyed by (scale, column, row), so zooming back to a
+    previous scale reuses them, and at most max_chunks are kept.
+
+    Adding, removing or moving a static sprite drops the chunks it
+    overlapped (before and after), which are baked again the next time
+    they are drawn. Changes the layer can't see, such as a new colour or
+    alpha, must be reported with refresh().
+    """
+
+    def __init__(self, bg, chunk_px=512, max_chunks=64, cellsize=4.0):
+
+        self.bg = bg
+        self.chunk_px = chunk_px
+        self.max_chunks = max_chunks
+
+        self._index = SpatialHash(cellsize)
+        self._order = {}  # : dict(Sprite -> int), insertion order
+        self._nextorder = 0
+
+        # : OrderedDict((scale, i, j) -> pg.Surface or None), None if empty
+        self._chunks = OrderedDict()
+        self.baked = 0  # : chunks baked since creation
+
+    def __len__(self):
+        return len(self._index)
+
+    def __contains__(self, sprite):
+        return sprite in self._index
+
+    @property
+    def sprites(self):
+        return sorted(self._index, key=self._order.__getitem__)
+
+    def add(self, sprite):
+
+        bounds = sprite.get_bounding_rect()
+        self._index.insert(sprite, bounds)
+        self._order[sprite] = self._nextorder
+        self._nextorder += 1
+        self._invalidate(bounds)
+
+    def remove(self, sprite):
+
+        self._invalidate(self._index.get_rect(sprite))
+        self._index.remove(sprite)
+        del self._order[sprite]
+
+    def move(self, sprite):
+        """updates the layer after sprite's rect or angle changed"""
+
+        self._invalidate(self._index.get_rect(sprite))
+        bounds = sprite.get_bounding_rect()
+        self._index.update(sprite, bounds)
+        self._invalidate(bounds)
+
+    def refresh(self, sprite=None):
+        """rebakes the chunks under sprite, or every chunk if None"""
+
+        if sprite is None:
+            self._chunks.clear()
+        else:
+            self._invalidate(self._index.get_rect(sprite))
+
+    def blits(self, camera, cache=None):
+        """
+        (key, surface, pixel position) for each non-empty chunk in frame
+        """
+
+        if not len(self._index):
+            return []
+
+        scale = camera.scale
+        size = self.chunk_px / scale
+        frame = camera.frame
+
+        i0, i1 = _span(frame.left, frame.right, size)
+        j0, j1 = _span(frame.bottom, frame.top, size)
+
+        # chunks are placed from a single origin so they tile exactly
+        ox, oy = camera.px_point((i0 * size, (j0 + 1) * size))
+        ox, oy = int(ox), int(oy)
+
+        out = []
+
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+
+                key = (scale, i, j)
+                surface = self._get_chunk(key, camera, cache)
+
+                if surface is not None:
+                    pos = (ox + (i - i0) * self.chunk_px,
+                           oy - (j - j0) * self.chunk_px)
+                    out.append((key, surface, pos))
+
+        return out
+
+    def _get_chunk(self, key, camera, cache):
+
+        chunks = self._chunks
+
+        if key in chunks:
+            chunks.move_to_end(key)
+            return chunks[key]
+
+        surface = chunks[key] = self._bake(key, camera, cache)
+        self.baked += 1
+
+        while len(chunks) > self.max_chunks:
+            chunks.popitem(last=False)
+
+        return surface
+
+    def _bake(self, key, camera, cache):
+
+        scale, i, j = key
+        area = _chunk_rect(key, self.chunk_px)
+        left, top = area.left, area.top
+
+        # sprites within a pixel of the chunk may still spill into it
+        pad = 2 / scale
+        order = self._order
+        sprites = [s for s in self._index.query(area.expanded(pad, pad))
+                   if s.visible]
+
+        if not sprites:
+            return None
+
+        sprites.sort(key=lambda s: (s.z, order[s]))
+
+        items = []
+
+        for s in sprites:
+            bounds = s.get_bounding_rect()
+            pos = (int((bounds.left - left) * scale),
+                   int((top - bounds.top) * scale))
+            sf = s._primitive(camera, cache)
+            if sf is None:
+                sf = s.get_resized_surface(camera, cache=cache)
+            items.append((sf, pos))
+
+        surface = pg.Surface((self.chunk_px, self.chunk_px))
+        surface.fill(self.bg)
+        draw_items(surface, items)
+
+        return surface
+
+    def _invalidate(self, bounds):
+        """drops every chunk overlapping bounds, at any scale"""
+
+        chunk_px = self.chunk_px
+        stale = []
+
+        for key in self._chunks:
+
+            pad = 2 / key[0]  # : same slack as in _bake
+            if bounds.expanded(pad, pad).colliderect(
+                    _chunk_rect(key, chunk_px)):
+                stale.append(key)
+
+        for key in stale:
+            del self._chunks[key]
+
+
+def _span(lo, hi, size):
+    """first and last index of the chunks of given size covering [lo, hi]"""
+    return math.floor(lo / size), math.floor(hi / size)
+
+
+def _chunk_rect(key, chunk_px):
+
+    scale, i, j = key
+    size = chunk_px / scale
+
+    return fs.FloatRect(i * size, j * size, size, size)
@@ -0,0 +1,134 @@
+from collections import OrderedDict
+
+
+def surface_bytes(surface):
+    """approximate memory used by a surface's pixels"""
+    return surface.get_pitch() * surface.get_height()
+
+
+class SurfaceCache:
+    """
+    Memory-bounded LRU cache of transformed surfaces
+
+    Meant to be shared by every sprite of a scene, so that sprites showing
+    the same source surface (or the same primitive colour) at the same
+    pixel size, angle and alpha share a single scaled/rotated copy.
+
+    Keys are hashable tuples of a kind and a source, then anything else;
+    sprites build them from their source surface or colour, pixel size,
+    quantised angle and alpha.
+    Source surfaces are keyed by identity, so they should be treated as
+    immutable once in use (or call invalidate() after changing one).
+
+    When the total size of cached surfaces exceeds maxbytes, the least
+    recently used surfaces are evicted. Surfaces larger than maxbytes on
+    their own are returned but never stored.
+    """
+
+    def __init__(self, maxbytes=64 * 2**20, angle_step=0.5):
+
+        self.maxbytes = maxbytes
+        self.angle_step = angle_step
+
+        self._surfaces = OrderedDict()  # : key -> (pg.Surface, int)
+        self._bytes = 0
+
+        self.reset_stats()
+
+    # Properties
+
+    @property
+    def bytes(self):
+        return self._bytes
+
+    def __len__(self):
+        return len(self._surfaces)
+
+    def __contains__(self, key):
+        return key in self._surfaces
+
+    # Statistics
+
+    def reset_stats(self):
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+    def stats(self):
+
+        total = self.hits + self.misses
+
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions,
+                "hitrate": self.hits / total if total else 0.,
+                "surfaces": len(self), "bytes": self._bytes}
+
+    # Methods
+
+    def quantise_angle(self, angle):
+        """angle rounded to the nearest multiple of angle_step, in [0, 360)"""
+
+        step = self.angle_step
+        if step:
+            angle = round(angle / step) * step
+
+        return angle % 360
+
+    def get(self, key):
+        """cached surface for key, or None"""
+
+        entry = self._surfaces.get(key)
+
+        if entry is None:
+            self.misses += 1
+            return None
+
+        self._surfaces.move_to_end(key)
+        self.hits += 1
+
+        return entry[0]
+
+    def put(self, key, surface):
+
+        size = surface_bytes(surface)
+
+        if key in self._surfaces:
+            self._bytes -= self._surfaces.pop(key)[1]
+
+        if size > self.maxbytes:
+            return
+
+        self._surfaces[key] = (surface, size)
+        self._bytes += size
+        self._evict()
+
+    def get_or_build(self, key, build):
+        """cached surface for key, calling build() to make it on a miss"""
+
+        surface = self.get(key)
+
+        if surface is None:
+            surface = build()
+            self.put(key, surface)
+
+        return surface
+
+    def invalidate(self, source):
+        """drops every entry built from source (the second item of its key)"""
+
+        # only that item: a colour may well equal some entry's pixel size
+        for key in [k for k in self._surfaces if k[1] == source]:
+            self._bytes -= self._surfaces.pop(key)[1]
+
+    def clear(self):
+
+        self._surfaces.clear()
+        self._bytes = 0
+
+    def _evict(self):
+
+        while self._bytes > self.maxbytes:
+            _, (_, size) = self._surfaces.popitem(last=False)
+            self._bytes -= size
+            self.evictions += 1
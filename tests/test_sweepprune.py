@@ -0,0 +1,139 @@
+import random
+
+import pytest
+
+from utils.floatshapes import FloatRect, FloatCircle
+from utils.sweepprune import SweepAndPrune
+
+
+def _brute_pairs(rects):
+
+    keys = sorted(rects)
+    return {frozenset((a, b))
+            for i, a in enumerate(keys) for b in keys[i + 1:]
+            if rects[a].colliderect(rects[b])}
+
+
+def _unordered(pairs):
+    return {frozenset(p) for p in pairs}
+
+
+def _random_rect(rng, side=20):
+
+    # some rects are flat, with a whole number position so that their
+    # sides can coincide with other flat ones
+    if rng.random() < 0.2:
+        return FloatRect(rng.randint(0, side), rng.randint(0, side),
+                         rng.choice((0, 1)), rng.choice((0, 1)))
+
+    return FloatRect.from_center(rng.uniform(0, side), rng.uniform(0, side),
+                                 rng.uniform(0.5, 3), rng.uniform(0.5, 3))
+
+
+def test_reinsert_before_step_drops_old_bounds():
+
+    sap = SweepAndPrune()
+    sap.insert("a", FloatRect(0, 0, 1, 1))
+    sap.insert("b", FloatRect(0.5, 0.5, 1, 1))
+    sap.step()
+    assert _unordered(sap.pairs) == {frozenset("ab")}
+
+    sap.remove("a")
+    sap.insert("a", FloatRect(10, 10, 1, 1))
+
+    assert sap.query(FloatRect(0, 0, 1, 1)) == {"b"}
+
+    sap.step()
+    assert sap.pairs == set()
+    assert sap.query(FloatRect(0, 0, 1, 1)) == {"b"}
+    assert sap.query(FloatRect(10, 10, 1, 1)) == {"a"}
+
+
+def test_zero_size_bounds():
+
+    sap = SweepAndPrune()
+    sap.insert(1, FloatRect(0, 0, 0, 1))
+    sap.insert(2, FloatCircle(0, 0, 0))
+    sap.insert(3, FloatRect(-1, -1, 2, 2))
+    sap.insert(4, FloatRect(0, 0, 0, 0))
+
+    added, _ = sap.step()
+    assert _unordered(added) == _brute_pairs(
+        {1: FloatRect(0, 0, 0, 1), 2: FloatCircle(0, 0, 0).get_rect(),
+         3: FloatRect(-1, -1, 2, 2), 4: FloatRect(0, 0, 0, 0)})
+
+    # and through the incremental path
+    sap.update(3, FloatRect(1, 1, 2, 2))
+    sap.step()
+    assert sap.pairs == set()
+    sap.update(3, FloatRect(-1, -1, 2, 2))
+    sap.step()
+    assert _unordered(sap.pairs) == _unordered(added)
+
+
+def test_query_uses_bounds_as_of_last_step():
+
+    sap = SweepAndPrune()
+    sap.insert("a", FloatRect(0, 0, 1, 1))
+    sap.step()
+    sap.update("a", FloatRect(10, 10, 1, 1))
+
+    assert sap.query(FloatRect(0, 0, 1, 1)) == {"a"}
+    assert sap.query(FloatRect(10, 10, 1, 1)) == set()
+
+    sap.step()
+    assert sap.query(FloatRect(0, 0, 1, 1)) == set()
+    assert sap.query(FloatRect(10, 10, 1, 1)) == {"a"}
+
+
+def test_query_skips_removed_keys():
+
+    sap = SweepAndPrune()
+    sap.insert("a", FloatRect(0, 0, 1, 1))
+    sap.step()
+    sap.remove("a")
+
+    assert sap.query(FloatRect(0, 0, 1, 1)) == set()
+
+
+@pytest.mark.parametrize("seed", range(10))
+def test_random_changes_match_brute_force(seed):
+
+    rng = random.Random(seed)
+    sap = SweepAndPrune()
+    rects = {}
+    nextkey = 0
+    before = set()
+
+    for _ in range(40):
+
+        for _ in range(rng.randint(0, 8)):
+            rects[nextkey] = _random_rect(rng)
+            sap.insert(nextkey, rects[nextkey])
+            nextkey += 1
+
+        for key in rng.sample(sorted(rects), min(len(rects), 3)):
+            action = rng.random()
+            if action < 0.4:
+                del rects[key]
+                sap.remove(key)
+            elif action < 0.7:
+                sap.remove(key)
+                rects[key] = _random_rect(rng)
+                sap.insert(key, rects[key])
+            else:
+                rects[key] = rects[key].shifted(rng.uniform(-1, 1),
+                                                rng.uniform(-1, 1))
+                sap.update(key, rects[key])
+
+        added, removed = sap.step()
+        expected = _brute_pairs(rects)
+
+        assert _unordered(sap.pairs) == expected
+        assert _unordered(added) - _unordered(removed) == expected - before
+        assert _unordered(removed) - _unordered(added) == before - expected
+        before = expected
+
+        area = _random_rect(rng, side=20).expanded(3, 3)
+        assert sap.query(area) == {k for k, r in rects.items()
+                                   if r.colliderect(area)}
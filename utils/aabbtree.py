@@ -0,0 +1,464 @@
+import math
+
+from utils.floatshapes import FloatRect
+
+
+def _union(a, b):
+    return (min(a[0], b[0]), min(a[1], b[1]),
+            max(a[2], b[2]), max(a[3], b[3]))
+
+
+def _perimeter(a):
+    return 2 * ((a[2] - a[0]) + (a[3] - a[1]))
+
+
+def _contains(a, b):
+    return a[0] <= b[0] and a[1] <= b[1] and b[2] <= a[2] and b[3] <= a[3]
+
+
+def _overlaps(a, b):
+    return not (a[0] >= b[2] or a[2] <= b[0] or a[1] >= b[3] or a[3] <= b[1])
+
+
+def _touches(a, b):
+    return not (a[0] > b[2] or a[2] < b[0] or a[1] > b[3] or a[3] < b[1])
+
+
+def _sides(rect):
+    return (rect.left, rect.bottom, rect.right, rect.top)
+
+
+def _fattened(sides, margin, dx=0., dy=0.):
+
+    l, b, r, t = sides
+    l, b, r, t = l - margin, b - margin, r + margin, t + margin
+
+    if dx < 0:
+        l += dx
+    else:
+        r += dx
+
+    if dy < 0:
+        b += dy
+    else:
+        t += dy
+
+    return (l, b, r, t)
+
+
+def _sides_to_lrbt(box):
+    """(left, bottom, right, top) -> (left, right, bottom, top)"""
+    return (box[0], box[2], box[1], box[3])
+
+
+class _Node:
+
+    __slots__ = ("box", "parent", "child1", "child2", "height",
+                 "key", "tight", "static", "id")
+
+    def __init__(self, box, parent=None):
+
+        self.box = box  # : (left, bottom, right, top)
+        self.parent = parent
+        self.child1 = None
+        self.child2 = None
+        self.height = 0
+
+        # leaf data
+        self.key = None
+        self.tight = None
+        self.static = False
+        self.id = None
+
+    @property
+    def isleaf(self):
+        return self.child1 is None
+
+
+class AABBTree:
+    """
+    Dynamic bounding volume tree over FloatRect bounds
+
+    Each object is a leaf holding a "fat" rectangle, its bounds expanded by
+    margin (and optionally in the direction of travel). move() only touches
+    the tree when the new bounds escape the fat rectangle, so objects that
+    creep along a little every tick rarely cause any tree update.
+
+    Static objects (e.g. walls) are stored without any margin, and pairs()
+    never reports two static objects against each other.
+
+    The tree is kept balanced with local rotations on every insertion and
+    removal, and is rebuilt from scratch after every rebuild_interval
+    structural changes if its height has drifted past twice the optimum.
+    """
+
+    def __init__(self, margin=0.1, predict=2.0, rebuild_interval=1000):
+
+        self.margin = float(margin)
+        self.predict = float(predict)
+        self.rebuild_interval = rebuild_interval
+
+        self._root = None
+        self._leaves = {}  # : dict(key -> _Node)
+        self._nextid = 0
+        self._changes = 0
+
+    # Properties
+
+    @property
+    def height(self):
+        return 0 if self._root is None else self._root.height
+
+    def __len__(self):
+        return len(self._leaves)
+
+    def __contains__(self, key):
+        return key in self._leaves
+
+    def __iter__(self):
+        return iter(self._leaves)
+
+    def get_rect(self, key):
+        return FloatRect.from_sides(*_sides_to_lrbt(self._leaves[key].tight))
+
+    def get_fat_rect(self, key):
+        return FloatRect.from_sides(*_sides_to_lrbt(self._leaves[key].box))
+
+    # Public methods
+
+    def insert(self, key, shape, static=False):
+        """Add shape (anything with get_rect()) under key"""
+
+        if key in self._leaves:
+            raise ValueError(f"{key} is already in the tree. "
+                             "Try move() instead?")
+
+        tight = _sides(shape.get_rect())
+        margin = 0. if static else self.margin
+
+        leaf = _Node(_fattened(tight, margin))
+        leaf.key = key
+        leaf.tight = tight
+        leaf.static = static
+        leaf.id = self._nextid
+        self._nextid += 1
+
+        self._leaves[key] = leaf
+        self._insert_leaf(leaf)
+        self._changed()
+
+    def remove(self, key):
+
+        leaf = self._leaves.pop(key)
+        self._remove_leaf(leaf)
+        self._changed()
+
+    def move(self, key, shape, displacement=None):
+        """
+        Update the bounds of key
+
+        displacement: optional (dx, dy) expected motion over the next
+            tick, used to stretch the fat rectangle in the direction of
+            travel
+
+        returns True if the tree had to be updated, False otherwise
+        """
+
+        leaf = self._leaves[key]
+        tight = _sides(shape.get_rect())
+        leaf.tight = tight
+
+        margin = 0. if leaf.static else self.margin
+
+        if displacement is None:
+            dx = dy = 0.
+        else:
+            dx, dy = displacement
+            dx, dy = dx * self.predict, dy * self.predict
+
+        fat = _fattened(tight, margin, dx, dy)
+
+        if _contains(leaf.box, tight):
+
+            # still inside, but the fat rectangle may have grown too large
+            # (e.g. the object moved fast and has since slowed down)
+            huge = _fattened(fat, 4 * margin)
+            if _contains(huge, leaf.box):
+                return False
+
+        self._remove_leaf(leaf)
+        leaf.box = fat
+        self._insert_leaf(leaf)
+        self._changed()
+
+        return True
+
+    def clear(self):
+
+        self._root = None
+        self._leaves.clear()
+        self._changes = 0
+
+    def query(self, rect, strict=True):
+        """Set of keys whose bounds collide with rect"""
+
+        box = _sides(rect)
+        return {leaf.key for leaf in self._query_leaves(box, strict)}
+
+    def pairs(self, strict=True):
+        """
+        List of (key1, key2) pairs whose bounds collide
+
+        Each pair is reported once, with key1 inserted before key2.
+        Pairs of two static objects are never reported.
+        """
+
+        result = []
+
+        for leaf in self._leaves.values():
+
+            if leaf.static:
+                continue
+
+            for other in self._query_leaves(leaf.tight, strict):
+
+                if other is leaf:
+                    continue
+
+                if other.static:
+                    pair = (leaf, other) if leaf.id < other.id else (other, leaf)
+                elif other.id > leaf.id:
+                    pair = (leaf, other)
+                else:
+                    continue
+
+                result.append((pair[0].key, pair[1].key))
+
+        return result
+
+    def rebuild(self):
+        """Rebuild an optimally balanced tree from the current leaves"""
+
+        leaves = list(self._leaves.values())
+        self._root = self._build(leaves) if leaves else None
+        if self._root is not None:
+            self._root.parent = None
+        self._changes = 0
+
+    # Queries
+
+    def _query_leaves(self, box, strict=True):
+
+        if self._root is None:
+            return []
+
+        test = _overlaps if strict else _touches
+        found = []
+        stack = [self._root]
+
+        while stack:
+
+            node = stack.pop()
+
+            if not _touches(node.box, box):
+                continue
+
+            if node.child1 is None:
+                if test(node.tight, box):
+                    found.append(node)
+            else:
+                stack.append(node.child1)
+                stack.append(node.child2)
+
+        return found
+
+    # Tree maintenance
+
+    def _changed(self):
+
+        self._changes += 1
+
+        if self._changes >= self.rebuild_interval:
+
+            self._changes = 0
+            n = len(self._leaves)
+
+            if n > 1 and self.height > 2 * math.ceil(math.log2(n)):
+                self.rebuild()
+
+    def _build(self, leaves):
+        """top-down median split along the longest axis"""
+
+        if len(leaves) == 1:
+            leaf = leaves[0]
+            leaf.child1 = leaf.child2 = None
+            leaf.height = 0
+            return leaf
+
+        box = leaves[0].box
+        for leaf in leaves[1:]:
+            box = _union(box, leaf.box)
+
+        axis = 0 if (box[2] - box[0]) >= (box[3] - box[1]) else 1
+        leaves.sort(key=lambda n: n.box[axis] + n.box[axis + 2])
+
+        mid = len(leaves) // 2
+        node = _Node(box)
+        node.child1 = self._build(leaves[:mid])
+        node.child2 = self._build(leaves[mid:])
+        node.child1.parent = node
+        node.child2.parent = node
+        node.height = 1 + max(node.child1.height, node.child2.height)
+
+        return node
+
+    def _replace_child(self, parent, old, new):
+
+        if parent is None:
+            self._root = new
+        elif parent.child1 is old:
+            parent.child1 = new
+        else:
+            parent.child2 = new
+
+    def _insert_leaf(self, leaf):
+
+        if self._root is None:
+            self._root = leaf
+            leaf.parent = None
+            return
+
+        # find the best sibling, using the perimeter as a cost heuristic
+
+        box = leaf.box
+        node = self._root
+
+        while node.child1 is not None:
+
+            c1, c2 = node.child1, node.child2
+
+            area = _perimeter(node.box)
+            combined = _perimeter(_union(node.box, box))
+
+            cost = 2 * combined
+            inheritance = 2 * (combined - area)
+
+            cost1 = _perimeter(_union(box, c1.box)) + inheritance
+            if c1.child1 is not None:
+                cost1 -= _perimeter(c1.box)
+
+            cost2 = _perimeter(_union(box, c2.box)) + inheritance
+            if c2.child1 is not None:
+                cost2 -= _perimeter(c2.box)
+
+            if cost < cost1 and cost < cost2:
+                break
+
+            node = c1 if cost1 < cost2 else c2
+
+        sibling = node
+        oldparent = sibling.parent
+
+        newparent = _Node(_union(box, sibling.box), oldparent)
+        newparent.height = sibling.height + 1
+        self._replace_child(oldparent, sibling, newparent)
+
+        newparent.child1 = sibling
+        newparent.child2 = leaf
+        sibling.parent = newparent
+        leaf.parent = newparent
+
+        self._refit(newparent)
+
+    def _remove_leaf(self, leaf):
+
+        if leaf is self._root:
+            self._root = None
+            return
+
+        parent = leaf.parent
+        grandparent = parent.parent
+        sibling = parent.child2 if parent.child1 is leaf else parent.child1
+
+        self._replace_child(grandparent, parent, sibling)
+        sibling.parent = grandparent
+        leaf.parent = None
+
+        if grandparent is not None:
+            self._refit(grandparent)
+
+    def _refit(self, node):
+        """walk up from node, rebalancing and fixing boxes and heights"""
+
+        while node is not None:
+
+            node = self._balance(node)
+
+            c1, c2 = node.child1, node.child2
+            node.height = 1 + max(c1.height, c2.height)
+            node.box = _union(c1.box, c2.box)
+
+            node = node.parent
+
+    def _balance(self, a):
+        """rotates the taller grandchild of a up if a is unbalanced"""
+
+        if a.child1 is None or a.height < 2:
+            return a
+
+        b, c = a.child1, a.child2
+        balance = c.height - b.height
+
+        if balance > 1:
+
+            f, g = c.child1, c.child2
+
+            c.child1 = a
+            c.parent = a.parent
+            a.parent = c
+            self._replace_child(c.parent, a, c)
+
+            if f.height > g.height:
+                c.child2, a.child2 = f, g
+                g.parent = a
+                a.box = _union(b.box, g.box)
+                c.box = _union(a.box, f.box)
+                a.height = 1 + max(b.height, g.height)
+                c.height = 1 + max(a.height, f.height)
+            else:
+                c.child2, a.child2 = g, f
+                f.parent = a
+                a.box = _union(b.box, f.box)
+                c.box = _union(a.box, g.box)
+                a.height = 1 + max(b.height, f.height)
+                c.height = 1 + max(a.height, g.height)
+
+            return c
+
+        if balance < -1:
+
+            d, e = b.child1, b.child2
+
+            b.child1 = a
+            b.parent = a.parent
+            a.parent = b
+            self._replace_child(b.parent, a, b)
+
+            if d.height > e.height:
+                b.child2, a.child1 = d, e
+                e.parent = a
+                a.box = _union(c.box, e.box)
+                b.box = _union(a.box, d.box)
+                a.height = 1 + max(c.height, e.height)
+                b.height = 1 + max(a.height, d.height)
+            else:
+                b.child2, a.child1 = e, d
+                d.parent = a
+                a.box = _union(c.box, d.box)
+                b.box = _union(a.box, e.box)
+                a.height = 1 + max(c.height, d.height)
+                b.height = 1 + max(a.height, e.height)
+
+            return b
+
+        return a
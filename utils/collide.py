@@ -1,88 +1,402 @@
+import math
 import numpy as np
-from multipledispatch import dispatch
 
-from utils.floatshapes import FloatRect, FloatCircle
+from utils.floatshapes import (FloatRect, FloatCircle, FloatPolygon,
+                              FloatRectArray, FloatCircleArray)
 
 
-_ZEROVEC = np.array((0., 0.))
+class CollisionRegistry:
+    """
+    Dispatch table from pairs of shape types to collision kernels
 
+    A kernel takes two shapes and returns a (dx, dy) pair: the vector by
+    which the first shape has to move to stop overlapping the second.
+    Registering a kernel for (A, B) also provides (B, A) by negating the
+    result, unless a kernel for (B, A) is registered explicitly.
 
-@dispatch(FloatRect, FloatRect)
-def collidevector(a, b):
+    Lookups for a pair of concrete types are resolved once, following the
+    method resolution order of both types, and then stored in a flat
+    table, so a call costs a single dict lookup on top of the kernel.
+    """
 
-    flipx = a.cx < b.cx
-    flipy = a.cy < b.cy
+    def __init__(self):
 
-    dx = (b.left - a.right) if flipx else (b.right - a.left)
-    dy = (b.bottom - a.top) if flipy else (b.top - a.bottom)
+        self._kernels = {}  # : dict((type, type) -> callable), registered
+        self._table = {}  # : dict((type, type) -> callable), resolved
+
+    def register(self, type_a, type_b, kernel=None, symmetric=True):
+        """
+        Register kernel for (type_a, type_b); usable as a decorator
+
+        symmetric: bool. If True, also provides (type_b, type_a) by
+                    negating the kernel, unless already registered
+        """
+
+        if kernel is None:
+            def _decorator(func):
+                self.register(type_a, type_b, func, symmetric=symmetric)
+                return func
+            return _decorator
+
+        self._kernels[(type_a, type_b)] = kernel
+
+        if symmetric and type_a is not type_b:
+            reverse = self._kernels.get((type_b, type_a))
+            if reverse is None or getattr(reverse, "_reversed", False):
+                self._kernels[(type_b, type_a)] = _reversed(kernel)
+
+        self._table.clear()
+
+    def resolve(self, type_a, type_b):
+        """kernel used for shapes of types (type_a, type_b)"""
+
+        try:
+            return self._table[(type_a, type_b)]
+        except KeyError:
+            pass
+
+        for ca in type_a.__mro__:
+            for cb in type_b.__mro__:
+                kernel = self._kernels.get((ca, cb))
+                if kernel is not None:
+                    self._table[(type_a, type_b)] = kernel
+                    return kernel
+
+        raise NotImplementedError(f"no collision kernel registered for "
+                                  f"({type_a.__name__}, {type_b.__name__})")
+
+    def xy(self, a, b):
+        """Fast path: returns the raw (dx, dy) result of the kernel"""
+
+        try:
+            kernel = self._table[(a.__class__, b.__class__)]
+        except KeyError:
+            kernel = self.resolve(a.__class__, b.__class__)
+
+        return kernel(a, b)
+
+    def __call__(self, a, b):
+        return np.array(self.xy(a, b))
+
+
+def _reversed(kernel):
+
+    def _kernel(a, b):
+        dx, dy = kernel(b, a)
+        return -dx, -dy
+
+    _kernel._reversed = True
+    return _kernel
+
+
+# Scalar collision vectors
+#
+# Kernels work on plain floats and return (dx, dy) tuples; collidevector
+# wraps the result in a numpy array, collidevector_xy returns it as is.
+
+
+collidevector = CollisionRegistry()
+collidevector_xy = collidevector.xy
+
+
+def _rectrect_xy(al, ab, aw, ah, bl, bb, bw, bh):
+
+    flipx = al + aw / 2 < bl + bw / 2
+    flipy = ab + ah / 2 < bb + bh / 2
+
+    dx = (bl - (al + aw)) if flipx else ((bl + bw) - al)
+    dy = (bb - (ab + ah)) if flipy else ((bb + bh) - ab)
 
     if (flipx and dx > 0) or (not flipx and dx < 0):
         dx = 0.
     if (flipy and dy > 0) or (not flipy and dy < 0):
         dy = 0.
 
-    if np.abs(dx) < np.abs(dy):
-        return np.array((dx, 0.))
+    if abs(dx) < abs(dy):
+        return (dx, 0.)
     else:
-        return np.array((0., dy))
+        return (0., dy)
+
 
+@collidevector.register(FloatRect, FloatRect)
+def _(a, b):
 
-@dispatch(FloatCircle, FloatRect)
-def collidevector(a, b):
+    return _rectrect_xy(a.left, a.bottom, a.width, a.height,
+                        b.left, b.bottom, b.width, b.height)
 
-    hw, hh = b.width / 2, b.height / 2
-    dcx, dcy = a.center - b.center
 
-    if np.abs(dcx) <= hw or np.abs(dcy) <= hh:
-        return collidevector(a.get_rect(), b)
-    
-    if (np.abs(dcx) - hw)**2 + (np.abs(dcy) - hh)**2 < a.r**2:
+@collidevector.register(FloatCircle, FloatRect)
+def _(a, b):
 
-        if (dcx >= 0 and dcy >= 0):
-            corner = b.topright
-        elif (dcx < 0 and dcy >= 0):
-            corner = b.topleft
-        elif (dcx >= 0 and dcy < 0):
-            corner = b.bottomright
-        elif (dcx < 0 and dcy < 0):
-            corner = b.bottomleft
+    cx, cy, r = a.cx, a.cy, a.r
+    bl, bb, bw, bh = b.left, b.bottom, b.width, b.height
 
-        dr = a.center - corner
-        dx, dy = dr
+    hw, hh = bw / 2, bh / 2
+    dcx = cx - (bl + hw)
+    dcy = cy - (bb + hh)
 
-        dist = np.sqrt(dx**2 + dy**2)
-        return np.array((dx, dy)) * (a.r / dist - 1)
+    if abs(dcx) <= hw or abs(dcy) <= hh:
+        return _rectrect_xy(cx - r, cy - r, 2 * r, 2 * r, bl, bb, bw, bh)
 
-    return _ZEROVEC.copy()
+    if (abs(dcx) - hw)**2 + (abs(dcy) - hh)**2 < r**2:
 
+        dx = cx - (bl + bw if dcx >= 0 else bl)
+        dy = cy - (bb + bh if dcy >= 0 else bb)
 
-@dispatch(FloatRect, FloatCircle)
-def collidevector(a, b):
+        factor = r / math.sqrt(dx**2 + dy**2) - 1
+        return (dx * factor, dy * factor)
 
-    return -collidevector(b, a)
+    return (0., 0.)
 
 
-@dispatch(FloatCircle, FloatCircle)
-def collidevector(a, b):
+@collidevector.register(FloatCircle, FloatCircle)
+def _(a, b):
 
     dx = a.cx - b.cx
     dy = a.cy - b.cy
     sqdist = dx**2 + dy**2
     radsum = a.r + b.r
-    sqrad = radsum**2
 
-    if sqdist < sqrad:
+    if sqdist < radsum**2:
 
-        dist = np.sqrt(sqdist)
-        ret = np.array((dx, dy))
-        return ret * (radsum / dist - 1)
+        if sqdist == 0:
+            # coincident centres have no push-out direction
+            return (math.nan, math.nan)
+
+        factor = radsum / math.sqrt(sqdist) - 1
+        return (dx * factor, dy * factor)
+
+    return (0., 0.)
+
+
+# Separating axis collision vectors
+#
+# Convex shapes are projected onto every candidate axis at once: vertices
+# of shape (N, K, 2) against axes of shape (N, M, 2) give projections of
+# shape (N, K, M). If the projections are disjoint on any axis, the pair
+# doesn't overlap; otherwise the push-out vector is along the axis with
+# the smallest overlap. The kernels work on N pairs at a time, and the
+# scalar collidevector kernels call them with N = 1.
+
+
+def _sat_resolve(mina, maxa, minb, maxb, axes):
+    """push-out vectors from (N, M) projection intervals along (N, M, 2)"""
+
+    up = maxb - mina  # moving a along +axis
+    down = maxa - minb  # moving a along -axis
+
+    depth = np.where(up < down, up, -down)
+    separated = np.any((up <= 0) | (down <= 0), axis=1)
+
+    best = np.argmin(np.abs(depth), axis=1)
+    rows = np.arange(len(best))
+
+    vectors = axes[rows, best] * depth[rows, best][:, None]
+    vectors[separated] = 0.
+
+    return vectors
+
+
+def sat_polygons(va, aa, vb, ab):
+    """
+    Batched separating axis test between convex polygons
+
+    va, vb: (N, Ka, 2) and (N, Kb, 2) vertices
+    aa, ab: (N, Ma, 2) and (N, Mb, 2) unit edge normals
+    returns (N, 2) push-out vectors for the first polygon of each pair
+    """
+
+    axes = np.concatenate((aa, ab), axis=1)
+
+    pa = np.einsum("nkd,nmd->nkm", va, axes)
+    pb = np.einsum("nkd,nmd->nkm", vb, axes)
+
+    return _sat_resolve(pa.min(axis=1), pa.max(axis=1),
+                        pb.min(axis=1), pb.max(axis=1), axes)
+
+
+def sat_circle_polygon(centers, radii, vb, ab):
+    """
+    Batched separating axis test between circles and convex polygons
+
+    centers: (N, 2), radii: (N,)
+    vb, ab: (N, Kb, 2) vertices and (N, Mb, 2) unit edge normals
+    returns (N, 2) push-out vectors for the circles
+    """
+
+    # besides the edge normals, the only candidate axis is the one
+    # through the vertex nearest to the circle's center
+
+    rows = np.arange(len(centers))
+    offsets = vb - centers[:, None, :]
+    nearest = vb[rows, np.argmin(np.einsum("nkd,nkd->nk", offsets, offsets),
+                                 axis=1)]
+
+    extra = nearest - centers
+    norm = np.linalg.norm(extra, axis=1)
+    extra = np.where(norm[:, None] > 0,
+                     extra / np.where(norm > 0, norm, 1.)[:, None],
+                     ab[:, 0])
+
+    axes = np.concatenate((ab, extra[:, None, :]), axis=1)
+
+    pc = np.einsum("nd,nmd->nm", centers, axes)
+    pb = np.einsum("nkd,nmd->nkm", vb, axes)
+
+    return _sat_resolve(pc - radii[:, None], pc + radii[:, None],
+                        pb.min(axis=1), pb.max(axis=1), axes)
+
+
+def _polygon_data(shape):
+    """(1, K, 2) vertices and (1, M, 2) axes of a single convex shape"""
+
+    if isinstance(shape, FloatRect):
+        shape = FloatPolygon.from_rect(shape)
+        return shape.vertices[None], _RECT_AXES
+
+    return shape.vertices[None], shape.axes[None]
+
+
+_RECT_AXES = np.array(((1., 0.), (0., 1.)))[None]
+
+
+@collidevector.register(FloatPolygon, FloatPolygon)
+def _(a, b):
+
+    dx, dy = sat_polygons(*_polygon_data(a), *_polygon_data(b))[0]
+    return (float(dx), float(dy))
+
+
+@collidevector.register(FloatPolygon, FloatRect)
+def _(a, b):
+
+    dx, dy = sat_polygons(*_polygon_data(a), *_polygon_data(b))[0]
+    return (float(dx), float(dy))
+
+
+@collidevector.register(FloatCircle, FloatPolygon)
+def _(a, b):
+
+    dx, dy = sat_circle_polygon(np.array(((a.cx, a.cy),)), np.array((a.r,)),
+                                *_polygon_data(b))[0]
+    return (float(dx), float(dy))
+
+
+# Batched collision vectors
+#
+# The kernels below take columns of floats and reproduce the branching of
+# the scalar collidevector implementations above using np.where, so that
+# many pairs can be resolved in a single pass.
+
+
+def _rectrect_kernel(al, ab, aw, ah, bl, bb, bw, bh):
+
+    flipx = al + aw / 2 < bl + bw / 2
+    flipy = ab + ah / 2 < bb + bh / 2
+
+    dx = np.where(flipx, bl - (al + aw), (bl + bw) - al)
+    dy = np.where(flipy, bb - (ab + ah), (bb + bh) - ab)
+
+    dx = np.where((flipx & (dx > 0)) | (~flipx & (dx < 0)), 0., dx)
+    dy = np.where((flipy & (dy > 0)) | (~flipy & (dy < 0)), 0., dy)
+
+    usex = np.abs(dx) < np.abs(dy)
+
+    return np.where(usex, dx, 0.), np.where(usex, 0., dy)
+
+
+def _circlerect_kernel(cx, cy, r, bl, bb, bw, bh):
+
+    hw, hh = bw / 2, bh / 2
+    dcx = cx - (bl + hw)
+    dcy = cy - (bb + hh)
+
+    edge = (np.abs(dcx) <= hw) | (np.abs(dcy) <= hh)
+    ex, ey = _rectrect_kernel(cx - r, cy - r, 2 * r, 2 * r, bl, bb, bw, bh)
+
+    inside = (np.abs(dcx) - hw)**2 + (np.abs(dcy) - hh)**2 < r**2
+
+    dx = cx - np.where(dcx >= 0, bl + bw, bl)
+    dy = cy - np.where(dcy >= 0, bb + bh, bb)
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(inside, r / np.sqrt(dx**2 + dy**2) - 1, 0.)
+
+    return (np.where(edge, ex, dx * factor),
+            np.where(edge, ey, dy * factor))
+
+
+def _circlecircle_kernel(acx, acy, ar, bcx, bcy, br):
+
+    dx = acx - bcx
+    dy = acy - bcy
+    sqdist = dx**2 + dy**2
+    radsum = ar + br
+
+    with np.errstate(divide="ignore", invalid="ignore"):
+        factor = np.where(sqdist < radsum**2,
+                          radsum / np.sqrt(sqdist) - 1, 0.)
+
+        return dx * factor, dy * factor
+
+
+_batchvectors = CollisionRegistry()
+
+
+@_batchvectors.register(FloatRectArray, FloatRectArray)
+def _(a, b):
+    return _rectrect_kernel(*a.data, *b.data)
+
+
+@_batchvectors.register(FloatCircleArray, FloatRectArray)
+def _(a, b):
+    return _circlerect_kernel(*a.data, *b.data)
+
+
+@_batchvectors.register(FloatCircleArray, FloatCircleArray)
+def _(a, b):
+    return _circlecircle_kernel(*a.data, *b.data)
+
+
+def _asbatch(shape):
+    """wraps single shapes as length-1 batches so they broadcast"""
+
+    if isinstance(shape, FloatRect):
+        return FloatRectArray.from_rects([shape])
+    if isinstance(shape, FloatCircle):
+        return FloatCircleArray.from_circles([shape])
+
+    return shape
+
+
+def collidevectors(a, b, pairs=None):
+    """
+    Batched collidevector, returns (N, 2) array of push-out vectors
+
+    a, b: FloatRectArray or FloatCircleArray; a single FloatRect or
+        FloatCircle is broadcast against the other batch
+    pairs: optional (N, 2) integer array; if given, row i of the result
+        is collidevector(a[pairs[i, 0]], b[pairs[i, 1]]), otherwise a and
+        b are paired elementwise
+    """
+
+    a, b = _asbatch(a), _asbatch(b)
+
+    if pairs is not None:
+        pairs = np.asarray(pairs, int).reshape(-1, 2)
+        a, b = a[pairs[:, 0]], b[pairs[:, 1]]
+
+    dx, dy = _batchvectors.xy(a, b)
+
+    return np.column_stack(np.broadcast_arrays(dx, dy))
 
-    else:
 
-        return np.array((0., 0.))
+def collidevector_matrix(a, b):
+    """collidevector for every pair of a and b, returns (N, M, 2) array"""
 
+    a, b = _asbatch(a), _asbatch(b)
 
-@dispatch(object, object)
-def collidevector(a, b):
+    ia, ib = np.meshgrid(np.arange(len(a)), np.arange(len(b)), indexing="ij")
+    pairs = np.column_stack((ia.ravel(), ib.ravel()))
 
-    raise NotImplementedError
+    return collidevectors(a, b, pairs).reshape(len(a), len(b), 2)
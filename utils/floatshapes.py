@@ -185,6 +185,13 @@ class FloatRect:
         return FloatRect.from_center(self.cx, self.cy,
                                      self.height, self.width)
 
+    def rotated(self, angle):
+        """rotated rectangle, as a FloatOrientedRect"""
+        return FloatOrientedRect.from_rect(self, angle)
+
+    def get_rect(self):
+        return self
+
     # Other methods
 
     def colliderect(self, other, strict=True):
@@ -210,7 +217,7 @@ class FloatRect:
             left = np.amax((self.left, other.left))
             right = np.amin((self.right, other.right))
             bottom = np.amax((self.bottom, other.bottom))
-            top = np.amin(self.right, other.right)
+            top = np.amin((self.top, other.top))
 
             return FloatRect.from_sides(left, right, bottom, top)
 
@@ -305,3 +312,640 @@ class FloatCircle:
     def get_rect(self):
         w = self.diameter
         return FloatRect.from_center(self.cx, self.cy, w, w)
+
+
+class FloatPolygon:
+    """Convex polygon class; treat as immutable"""
+
+    def __init__(self, vertices):
+
+        vertices = np.array(vertices, float)
+
+        if vertices.ndim != 2 or vertices.shape[1] != 2 or len(vertices) < 3:
+            raise ValueError("a polygon needs at least 3 (x, y) vertices")
+
+        # store vertices counter-clockwise, so that edge normals point out
+        x, y = vertices[:, 0], vertices[:, 1]
+        if np.sum(x * np.roll(y, -1) - np.roll(x, -1) * y) < 0:
+            vertices = vertices[::-1].copy()
+
+        vertices.flags.writeable = False
+        self._vertices = vertices
+        self._axes = None
+
+    @property
+    def vertices(self):
+        """(K, 2) read-only array of vertices, counter-clockwise"""
+        return self._vertices
+
+    @property
+    def axes(self):
+        """(K, 2) read-only array of outward unit edge normals"""
+
+        if self._axes is None:
+            edges = np.roll(self._vertices, -1, axis=0) - self._vertices
+            normals = np.column_stack((edges[:, 1], -edges[:, 0]))
+            normals /= np.linalg.norm(normals, axis=1)[:, None]
+            normals.flags.writeable = False
+            self._axes = normals
+
+        return self._axes
+
+    @property
+    def center(self):
+        return self._vertices.mean(axis=0)
+
+    @property
+    def centerx(self):
+        return float(self._vertices[:, 0].mean())
+
+    @property
+    def cx(self):
+        return float(self._vertices[:, 0].mean())
+
+    @property
+    def centery(self):
+        return float(self._vertices[:, 1].mean())
+
+    @property
+    def cy(self):
+        return float(self._vertices[:, 1].mean())
+
+    def shifted(self, dx, dy):
+        return FloatPolygon(self._vertices + (dx, dy))
+
+    def rotated(self, angle, about=None):
+        """polygon rotated by angle (degrees) about about, default center"""
+
+        if about is None:
+            about = self.center
+
+        return FloatPolygon([rotate(p, angle, about) for p in self._vertices])
+
+    def get_rect(self):
+        return FloatRect.that_contains(self._vertices)
+
+    # Constructors
+
+    @classmethod
+    def from_rect(cls, rect):
+        return cls(rect.corners)
+
+
+class FloatOrientedRect(FloatPolygon):
+    """
+    Rectangle rotated by angle (degrees, counter-clockwise) about its
+    center; treat as immutable
+    """
+
+    def __init__(self, centerx, centery, width, height, angle=0.):
+
+        if width < 0 or height < 0:
+            raise ValueError("width and height must be positive")
+
+        self._cx = float(centerx)
+        self._cy = float(centery)
+        self._width = float(width)
+        self._height = float(height)
+        self._angle = float(angle)
+
+        a = self._angle * _DEG2RAD
+        c, s = np.cos(a), np.sin(a)
+        hw, hh = self._width / 2, self._height / 2
+
+        local = np.array(((-hw, -hh), (hw, -hh), (hw, hh), (-hw, hh)))
+        rot = np.array(((c, s), (-s, c)))
+
+        super().__init__(local @ rot + (self._cx, self._cy))
+
+    @property
+    def axes(self):
+        # opposite edges share an axis, so two are enough
+        return super().axes[:2]
+
+    @property
+    def center(self):
+        return toarray(self._cx, self._cy)
+
+    @property
+    def centerx(self):
+        return self._cx
+
+    @property
+    def cx(self):
+        return self._cx
+
+    @property
+    def centery(self):
+        return self._cy
+
+    @property
+    def cy(self):
+        return self._cy
+
+    @property
+    def width(self):
+        return self._width
+
+    @property
+    def height(self):
+        return self._height
+
+    @property
+    def size(self):
+        return (self._width, self._height)
+
+    @property
+    def angle(self):
+        return self._angle
+
+    def shifted(self, dx, dy):
+        return FloatOrientedRect(self._cx + dx, self._cy + dy,
+                                 self._width, self._height, self._angle)
+
+    def rotated(self, angle, about=None):
+
+        if about is None:
+            return FloatOrientedRect(self._cx, self._cy, self._width,
+                                     self._height, self._angle + angle)
+
+        cx, cy = rotate(self.center, angle, about)
+        return FloatOrientedRect(cx, cy, self._width, self._height,
+                                 self._angle + angle)
+
+    def get_rect(self):
+        return FloatRect.from_center(self._cx, self._cy,
+                                     self._width, self._height
+                                     ).rotated_bounds(self._angle)
+
+    # Constructors
+
+    @classmethod
+    def from_rect(cls, rect, angle=0.):
+        return cls(rect.cx, rect.cy, rect.width, rect.height, angle)
+
+
+def _column(x, n):
+    """broadcasts scalar or array-like x to a float array of length n"""
+    return np.broadcast_to(np.asarray(x, float), (n,))
+
+
+class FloatRectArray:
+    """
+    Batch of rectangles stored as contiguous columns; treat as immutable
+
+    The data is held as a (4, N) array whose rows are the lefts, bottoms,
+    widths and heights, so that each column of values is contiguous.
+    Slicing returns an array viewing the same data, and integer indexing
+    extracts a single FloatRect.
+    """
+
+    def __init__(self, lefts, bottoms, widths, heights):
+
+        n = np.broadcast(np.asarray(lefts), np.asarray(bottoms),
+                         np.asarray(widths), np.asarray(heights)).size
+
+        data = np.empty((4, n))
+        data[0] = _column(lefts, n)
+        data[1] = _column(bottoms, n)
+        data[2] = _column(widths, n)
+        data[3] = _column(heights, n)
+
+        if np.any(data[2:] < 0):
+            raise ValueError("width and height must be positive")
+
+        self._data = data
+
+    @classmethod
+    def _from_data(cls, data):
+        """wraps an existing (4, N) array without copying or checking it"""
+
+        obj = cls.__new__(cls)
+        obj._data = data
+        return obj
+
+    # Basic properties
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def left(self):
+        return self._data[0]
+
+    @property
+    def bottom(self):
+        return self._data[1]
+
+    @property
+    def width(self):
+        return self._data[2]
+
+    @property
+    def height(self):
+        return self._data[3]
+
+    @property
+    def top(self):
+        return self._data[1] + self._data[3]
+
+    @property
+    def right(self):
+        return self._data[0] + self._data[2]
+
+    @property
+    def size(self):
+        return self._data[2:].T
+
+    @property
+    def centerx(self):
+        return self._data[0] + self._data[2] / 2
+
+    @property
+    def cx(self):
+        return self._data[0] + self._data[2] / 2
+
+    @property
+    def centery(self):
+        return self._data[1] + self._data[3] / 2
+
+    @property
+    def cy(self):
+        return self._data[1] + self._data[3] / 2
+
+    @property
+    def center(self):
+        return np.column_stack((self.cx, self.cy))
+
+    @property
+    def topleft(self):
+        return np.column_stack((self.left, self.top))
+
+    @property
+    def topright(self):
+        return np.column_stack((self.right, self.top))
+
+    @property
+    def bottomleft(self):
+        return np.column_stack((self.left, self.bottom))
+
+    @property
+    def bottomright(self):
+        return np.column_stack((self.right, self.bottom))
+
+    @property
+    def corners(self):
+        """(N, 4, 2) array, in the same order as FloatRect.corners"""
+        return np.stack((self.bottomleft, self.bottomright,
+                         self.topright, self.topleft), axis=1)
+
+    # Dunders
+
+    def __len__(self):
+        return self._data.shape[1]
+
+    def __getitem__(self, index):
+
+        if isinstance(index, (int, np.integer)):
+            return FloatRect(*self._data[:, index])
+
+        return FloatRectArray._from_data(self._data[:, index])
+
+    def __setitem__(self, index, rect):
+
+        if isinstance(rect, FloatRectArray):
+            self._data[:, index] = rect._data
+        else:
+            self._data[:, index] = (rect.left, rect.bottom,
+                                    rect.width, rect.height)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return f"FloatRectArray(<{len(self)} rects>)"
+
+    # Moving methods
+
+    def shifted(self, dx, dy):
+
+        data = self._data.copy()
+        data[0] += dx
+        data[1] += dy
+
+        return FloatRectArray._from_data(data)
+
+    def movedto(self, newx, newy):
+
+        newx = self.cx if newx is None else newx
+        newy = self.cy if newy is None else newy
+
+        return FloatRectArray.from_center(newx, newy, self.width, self.height)
+
+    def resized(self, newwidth, newheight, scalefrom="center"):
+
+        nw = self.width if newwidth is None else _column(newwidth, len(self))
+        nh = self.height if newheight is None else _column(newheight, len(self))
+
+        if scalefrom == "center":
+            return FloatRectArray.from_center(self.cx, self.cy, nw, nh)
+
+        if scalefrom == "bottomleft":
+            return FloatRectArray(self.left, self.bottom, nw, nh)
+
+        if scalefrom == "bottomright":
+            return FloatRectArray(self.right - nw, self.bottom, nw, nh)
+
+        if scalefrom == "topleft":
+            return FloatRectArray(self.left, self.top - nh, nw, nh)
+
+        if scalefrom == "topright":
+            return FloatRectArray(self.right - nw, self.top - nh, nw, nh)
+
+    def scaled(self, scale, scalefrom="center"):
+        return self.resized(self.width * scale, self.height * scale,
+                            scalefrom=scalefrom)
+
+    def xyscaled(self, scalex, scaley, scalefrom="center"):
+        return self.resized(self.width * scalex, self.height * scaley,
+                            scalefrom=scalefrom)
+
+    def expanded(self, expandx, expandy):
+        return FloatRectArray.from_center(self.cx, self.cy,
+                                          self.width + expandx,
+                                          self.height + expandy)
+
+    def rotated_bounds(self, angle):
+        """
+        Bounding axis-aligned rectangles of rotated rectangles
+
+        angle may be a scalar or one angle per rectangle, in degrees
+        """
+
+        angle = np.asarray(angle, float) * _DEG2RAD
+        c, s = np.abs(np.cos(angle)), np.abs(np.sin(angle))
+
+        w, h = self.width, self.height
+
+        return FloatRectArray.from_center(self.cx, self.cy,
+                                          c * w + s * h,
+                                          s * w + c * h)
+
+    # Other methods
+
+    def colliderect(self, other, strict=True):
+        """
+        Elementwise collision test, returns boolean array of length N
+
+        other may be a single FloatRect, tested against every rectangle,
+        or a FloatRectArray of the same length
+        """
+
+        if strict:
+
+            return ~((self.left >= other.right) |
+                     (self.right <= other.left) |
+                     (self.bottom >= other.top) |
+                     (self.top <= other.bottom))
+
+        else:
+
+            return ~((self.left > other.right) |
+                     (self.right < other.left) |
+                     (self.bottom > other.top) |
+                     (self.top < other.bottom))
+
+    def collidematrix(self, other, strict=True):
+        """Pairwise collision test against FloatRectArray, returns (N, M)"""
+
+        sl, sr = self.left[:, None], self.right[:, None]
+        sb, st = self.bottom[:, None], self.top[:, None]
+        ol, orr = other.left[None, :], other.right[None, :]
+        ob, ot = other.bottom[None, :], other.top[None, :]
+
+        if strict:
+            return ~((sl >= orr) | (sr <= ol) | (sb >= ot) | (st <= ob))
+        else:
+            return ~((sl > orr) | (sr < ol) | (sb > ot) | (st < ob))
+
+    def intersectrect(self, other):
+        """
+        Elementwise intersection with FloatRect or FloatRectArray
+
+        Rectangles which don't intersect are filled with nan,
+        where FloatRect.intersectrect would return None
+        """
+
+        hit = self.colliderect(other, strict=False)
+
+        left = np.maximum(self.left, other.left)
+        right = np.minimum(self.right, other.right)
+        bottom = np.maximum(self.bottom, other.bottom)
+        top = np.minimum(self.top, other.top)
+
+        data = np.full((4, len(self)), np.nan)
+        data[0, hit] = left[hit]
+        data[1, hit] = bottom[hit]
+        data[2, hit] = (right - left)[hit]
+        data[3, hit] = (top - bottom)[hit]
+
+        return FloatRectArray._from_data(data)
+
+    def get_bounds(self):
+        """smallest FloatRect containing every rectangle"""
+
+        return FloatRect.from_sides(np.amin(self.left), np.amax(self.right),
+                                    np.amin(self.bottom), np.amax(self.top))
+
+    def to_rects(self):
+        return list(self)
+
+    # Constructors
+
+    @classmethod
+    def from_rects(cls, rects):
+        """batch built from an iterable of FloatRects"""
+
+        rects = list(rects)
+        data = np.empty((4, len(rects)))
+
+        for i, r in enumerate(rects):
+            data[:, i] = (r.left, r.bottom, r.width, r.height)
+
+        return cls._from_data(data)
+
+    @classmethod
+    def from_center(cls, cx, cy, width, height):
+        """rectangles defined by center coords and sizes"""
+
+        width = np.asarray(width, float)
+        height = np.asarray(height, float)
+
+        return cls(np.asarray(cx) - width / 2, np.asarray(cy) - height / 2,
+                   width, height)
+
+    @classmethod
+    def from_sides(cls, left, right, bottom, top, strictsigns=True):
+        """rectangles defined by coords of sides"""
+
+        left, right = np.asarray(left, float), np.asarray(right, float)
+        bottom, top = np.asarray(bottom, float), np.asarray(top, float)
+
+        if np.any(left > right) or np.any(bottom > top):
+
+            if strictsigns:
+                raise ValueError("left can't be greater than right "
+                                 "nor bottom greater than top")
+
+            left, right = np.minimum(left, right), np.maximum(left, right)
+            bottom, top = np.minimum(bottom, top), np.maximum(bottom, top)
+
+        return cls(left, bottom, right - left, top - bottom)
+
+    @classmethod
+    def that_contains(cls, points):
+        """
+        smallest rectangles containing each group of points
+
+        points: array-like of shape (N, K, 2), giving N groups of K points
+        """
+
+        points = np.asarray(points, float)
+        mins = np.amin(points, axis=1)
+        maxs = np.amax(points, axis=1)
+
+        return cls(mins[:, 0], mins[:, 1],
+                   maxs[:, 0] - mins[:, 0], maxs[:, 1] - mins[:, 1])
+
+
+class FloatCircleArray:
+    """
+    Batch of circles stored as contiguous columns; treat as immutable
+
+    The data is held as a (3, N) array whose rows are the center x coords,
+    center y coords and radii. Indexing works as for FloatRectArray.
+    """
+
+    def __init__(self, centerxs, centerys, radii):
+
+        n = np.broadcast(np.asarray(centerxs), np.asarray(centerys),
+                         np.asarray(radii)).size
+
+        data = np.empty((3, n))
+        data[0] = _column(centerxs, n)
+        data[1] = _column(centerys, n)
+        data[2] = _column(radii, n)
+
+        self._data = data
+
+    @classmethod
+    def _from_data(cls, data):
+        """wraps an existing (3, N) array without copying or checking it"""
+
+        obj = cls.__new__(cls)
+        obj._data = data
+        return obj
+
+    # Basic properties
+
+    @property
+    def data(self):
+        return self._data
+
+    @property
+    def center(self):
+        return self._data[:2].T
+
+    @property
+    def centerx(self):
+        return self._data[0]
+
+    @property
+    def centery(self):
+        return self._data[1]
+
+    @property
+    def cx(self):
+        return self._data[0]
+
+    @property
+    def cy(self):
+        return self._data[1]
+
+    @property
+    def radius(self):
+        return self._data[2]
+
+    @property
+    def r(self):
+        return self._data[2]
+
+    @property
+    def diameter(self):
+        return 2 * self._data[2]
+
+    # Dunders
+
+    def __len__(self):
+        return self._data.shape[1]
+
+    def __getitem__(self, index):
+
+        if isinstance(index, (int, np.integer)):
+            cx, cy, r = self._data[:, index]
+            return FloatCircle(float(cx), float(cy), float(r))
+
+        return FloatCircleArray._from_data(self._data[:, index])
+
+    def __setitem__(self, index, circle):
+
+        if isinstance(circle, FloatCircleArray):
+            self._data[:, index] = circle._data
+        else:
+            self._data[:, index] = (circle.cx, circle.cy, circle.r)
+
+    def __iter__(self):
+        for i in range(len(self)):
+            yield self[i]
+
+    def __repr__(self):
+        return f"FloatCircleArray(<{len(self)} circles>)"
+
+    # Methods
+
+    def shifted(self, dx, dy):
+
+        data = self._data.copy()
+        data[0] += dx
+        data[1] += dy
+
+        return FloatCircleArray._from_data(data)
+
+    def scaled(self, scale):
+        return FloatCircleArray(self.cx, self.cy, self.r * scale)
+
+    def get_rect(self):
+        w = self.diameter
+        return FloatRectArray.from_center(self.cx, self.cy, w, w)
+
+    def get_bounds(self):
+        return self.get_rect().get_bounds()
+
+    def to_circles(self):
+        return list(self)
+
+    # Constructors
+
+    @classmethod
+    def from_circles(cls, circles):
+        """batch built from an iterable of FloatCircles"""
+
+        circles = list(circles)
+        data = np.empty((3, len(circles)))
+
+        for i, c in enumerate(circles):
+            data[:, i] = (c.cx, c.cy, c.r)
+
+        return cls._from_data(data)
@@ -0,0 +1,149 @@
+import time
+
+from utils.floatshapes import FloatRect
+
+
+class Interpolator:
+    """
+    Smooths sprites and cameras between two simulation states
+
+    Call before_tick() before every simulation tick. Before drawing,
+    apply(alpha) moves every sprite's rect (and every camera's center)
+    alpha of the way from where it was before the last tick to where it
+    is now; restore() puts the simulated positions back afterwards, so
+    the simulation never sees interpolated values.
+
+    sprites and cameras may be live lists (e.g. Scene.sprites); only
+    positions are interpolated, sizes and angles are taken as they are.
+    """
+
+    def __init__(self, sprites=(), cameras=()):
+
+        self.sprites = sprites
+        self.cameras = cameras
+
+        self._prev = {}  # : dict(Sprite -> FloatRect)
+        self._prevcams = {}  # : dict(Camera -> np.array)
+        self._saved = []  # : list((Sprite, FloatRect)) during apply()
+        self._savedcams = []
+
+    def before_tick(self):
+
+        self._prev = {s: s.rect for s in self.sprites}
+        self._prevcams = {c: c.center.copy() for c in self.cameras}
+
+    def apply(self, alpha):
+
+        self.restore()
+
+        for s in self.sprites:
+
+            prev = self._prev.get(s)
+            rect = s.rect
+
+            if prev is None or (prev.cx, prev.cy) == (rect.cx, rect.cy):
+                continue
+
+            # not movedto(), which would keep the old coordinate for a 0
+            s.rect = FloatRect.from_center(
+                prev.cx + (rect.cx - prev.cx) * alpha,
+                prev.cy + (rect.cy - prev.cy) * alpha,
+                rect.width, rect.height)
+            self._saved.append((s, rect))
+
+        for c in self.cameras:
+
+            prev = self._prevcams.get(c)
+
+            if prev is None:
+                continue
+
+            center = c.center
+            c.center = prev + (center - prev) * alpha
+            self._savedcams.append((c, center))
+
+    def restore(self):
+
+        for s, rect in self._saved:
+            s.rect = rect
+        for c, center in self._savedcams:
+            c.center = center
+
+        self._saved = []
+        self._savedcams = []
+
+
+class GameLoop:
+    """
+    Runs a simulation at a fixed rate, independently of the frame rate
+
+    Each call to frame() adds the real time elapsed since the previous
+    call to an accumulator, runs tick(dt) once for every whole dt in it,
+    then calls draw() once with the leftover fraction of a tick handed to
+    interpolator (if given), so that motion looks smooth at any frame
+    rate.
+
+    To avoid a spiral of death, where slow ticks make the next frame
+    need even more of them, at most max_ticks ticks are run per frame;
+    the simulation time that couldn't be caught up is dropped (counted
+    in dropped) and the game slows down instead.
+
+    clock returns the current time in seconds.
+    """
+
+    def __init__(self, tick, draw, dt, interpolator=None, max_ticks=5,
+                 clock=time.perf_counter):
+
+        self.tick = tick
+        self.draw = draw
+        self.dt = dt
+        self.interpolator = interpolator
+        self.max_ticks = max_ticks
+        self.clock = clock
+
+        self.accumulator = 0.
+        self.alpha = 0.  # : fraction of a tick drawn ahead of the last one
+        self.ticks = 0  # : ticks run in the last frame
+        self.dropped = 0.  # : simulation time dropped since creation
+        self._last = None
+
+    def frame(self):
+        """
+        runs the ticks due since the last frame, then draws; returns what
+        draw() returned
+        """
+
+        now = self.clock()
+        if self._last is not None:
+            self.accumulator += now - self._last
+        self._last = now
+
+        dt = self.dt
+        interp = self.interpolator
+        ticks = 0
+
+        while self.accumulator >= dt and ticks < self.max_ticks:
+
+            if interp is not None:
+                interp.before_tick()
+
+            self.tick(dt)
+            self.accumulator -= dt
+            ticks += 1
+
+        if self.accumulator >= dt:
+            kept = self.accumulator % dt
+            self.dropped += self.accumulator - kept
+            self.accumulator = kept
+
+        self.ticks = ticks
+        self.alpha = self.accumulator / dt
+
+        if interp is None:
+            return self.draw()
+
+        interp.apply(self.alpha)
+        try:
+            return self.draw()
+        finally:
+            interp.restore()
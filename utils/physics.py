@@ -0,0 +1,420 @@
+import math
+import numpy as np
+
+from utils.collide import collidevector_xy
+from utils.floatshapes import FloatRect
+from utils.spatialhash import SpatialHash
+from utils.swept import timeofimpact
+
+
+class Body:
+    """
+    Shape simulated by a World
+
+    The shape (FloatRect or FloatCircle) is replaced by a shifted copy as
+    the body moves. Static bodies have infinite mass: they push dynamic
+    bodies out but are never moved by the world.
+    """
+
+    def __init__(self, shape, velocity=(0., 0.), mass=1.0, static=False):
+
+        if not static and mass <= 0:
+            raise ValueError("mass of a dynamic body must be positive")
+
+        self.shape = shape
+        self._static = static
+        self.invmass = 0. if static else 1 / mass
+
+        self._vx, self._vy = (float(v) for v in velocity)
+        self._version = 0  # : bumped every time the solver moves the body
+        self.awake = not static
+        self._sleeptime = 0.
+        self._id = None
+
+    @property
+    def static(self):
+        return self._static
+
+    @property
+    def velocity(self):
+        return np.array((self._vx, self._vy))
+
+    @velocity.setter
+    def velocity(self, value):
+
+        self._vx, self._vy = (float(v) for v in value)
+
+        if self._vx or self._vy:
+            self.wake()
+
+    def wake(self):
+
+        if not self._static:
+            self.awake = True
+            self._sleeptime = 0.
+
+    def shift(self, dx, dy):
+        """Move the body by hand; wakes it up"""
+
+        self.shape = self.shape.shifted(dx, dy)
+        self.wake()
+
+
+class _Contact:
+
+    __slots__ = ("pose", "vector", "normal", "correction", "hit", "seen",
+                 "versions")
+
+    def __init__(self):
+
+        self.pose = None  # : (ax, ay, bx, by) when vector was computed
+        self.vector = (0., 0.)
+        self.normal = (0., 0.)
+        self.correction = None  # : total push applied to a in last solve
+        self.hit = False
+        self.seen = None
+        self.versions = None  # : body versions at the last solver check
+
+
+class ContactCache:
+    """
+    Narrow-phase results kept between steps, keyed by pair of bodies
+
+    For every pair examined by the World, the cache holds the last
+    collidevector of the pair, its unit normal, the positions of both
+    bodies when it was computed, and the total push the solver ended up
+    applying to the pair. If neither body has moved by more than
+    tolerance since, the cached vector is reused instead of running the
+    narrow phase again, and the solver can warm-start from the previous
+    total push. Pairs that weren't examined during a step are evicted.
+
+    hits, misses, evictions and warmstarts count what happened since the
+    last reset_stats().
+    """
+
+    def __init__(self, tolerance=1e-4):
+
+        self.tolerance = tolerance
+        self._entries = {}  # : dict((int, int) -> _Contact)
+        self._step = 0
+
+        self.reset_stats()
+
+    def __len__(self):
+        return len(self._entries)
+
+    @property
+    def hitrate(self):
+        total = self.hits + self.misses
+        return self.hits / total if total else 0.
+
+    def reset_stats(self):
+
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.warmstarts = 0
+
+    def stats(self):
+        return {"hits": self.hits, "misses": self.misses,
+                "evictions": self.evictions, "warmstarts": self.warmstarts,
+                "hitrate": self.hitrate, "size": len(self)}
+
+    def clear(self):
+        self._entries.clear()
+
+    def lookup(self, a, b):
+        """cached or freshly computed _Contact for bodies a and b"""
+
+        key = (a._id, b._id)
+        pose = (a.shape.cx, a.shape.cy, b.shape.cx, b.shape.cy)
+
+        contact = self._entries.get(key)
+        tol = self.tolerance
+
+        if contact is None:
+            contact = self._entries[key] = _Contact()
+        elif contact.seen == self._step - 1 and all(
+                abs(p - q) <= tol for p, q in zip(pose, contact.pose)):
+            contact.hit = True
+            contact.seen = self._step
+            self.hits += 1
+            return contact
+
+        dx, dy = collidevector_xy(a.shape, b.shape)
+        norm = math.hypot(dx, dy)
+
+        contact.pose = pose
+        contact.vector = (dx, dy)
+        contact.normal = (dx / norm, dy / norm) if norm > 0 else (0., 0.)
+        contact.correction = None
+        contact.hit = False
+        contact.seen = self._step
+        self.misses += 1
+
+        return contact
+
+    def end_step(self):
+        """evicts pairs not looked up during this step"""
+
+        step = self._step
+        stale = [k for k, c in self._entries.items() if c.seen != step]
+
+        for k in stale:
+            del self._entries[k]
+
+        self.evictions += len(stale)
+        self._step += 1
+
+
+class World:
+    """
+    Collection of Bodies, resolved against each other every step
+
+    Each step moves the awake bodies by their velocity, finds contacts
+    through a SpatialHash broadphase, then runs a fixed number of solver
+    iterations over all contacts. Each iteration pushes overlapping
+    bodies apart by their collidevector, split according to their
+    inverse masses.
+
+    Pairs whose bounds come within contact_margin of each other are kept
+    as contacts for the whole step, so overlaps created by the solver
+    itself (e.g. a body pushed into a wall) are resolved in later
+    iterations. Dynamic bodies in contact form islands. When every body of an island
+    has moved slower than sleep_speed for sleep_time seconds, the whole
+    island is put to sleep: sleeping bodies are neither moved nor used to
+    look for contacts, until an awake body touches them or they are given
+    a velocity. Set sleep_time to None to disable sleeping.
+
+    With ccd=True, moving bodies are swept against static bodies rather
+    than teleported by their velocity, so that fast bodies or large
+    timesteps can't tunnel through thin walls. A body which hits a wall
+    stops there and slides along it for the rest of the step.
+
+    Narrow-phase results go through a ContactCache (see contact_cache),
+    reused while bodies move less than cache_tolerance between steps.
+    With warm_start=True, the first solver iteration over such a contact
+    applies the total push it received in the previous step, so resting
+    stacks converge in a single iteration.
+    """
+
+    def __init__(self, iterations=4, cellsize=2.0, contact_margin=0.05,
+                 sleep_speed=0.01, sleep_time=0.5, ccd=False,
+                 cache_tolerance=1e-4, warm_start=True):
+
+        self.iterations = iterations
+        self.contact_margin = contact_margin
+        self.ccd = ccd
+        self.warm_start = warm_start
+        self.contact_cache = ContactCache(cache_tolerance)
+        self.sleep_speed = sleep_speed
+        self.sleep_time = sleep_time
+
+        self._broadphase = SpatialHash(cellsize)
+        self._bodies = []
+        self._nextid = 0
+
+        self.contacts = []  # : list((Body, Body)), as of the last step
+        self.islands = []  # : list(list(Body)), as of the last step
+
+    @property
+    def bodies(self):
+        return tuple(self._bodies)
+
+    def add_body(self, body):
+
+        if body._id is not None:
+            raise ValueError("body is already in a world")
+
+        body._id = self._nextid
+        self._nextid += 1
+
+        self._bodies.append(body)
+        self._broadphase.insert(body, body.shape)
+
+    def remove_body(self, body):
+
+        self._bodies.remove(body)
+        self._broadphase.remove(body)
+        body._id = None
+
+    def step(self, dt):
+
+        broadphase = self._broadphase
+        awake = [b for b in self._bodies if b.awake]
+        wasawake = set(awake)
+        start = {b: (b.shape.cx, b.shape.cy) for b in awake}
+
+        # Integrate
+
+        for b in awake:
+            if b._vx or b._vy:
+                if self.ccd:
+                    self._sweep_move(b, b._vx * dt, b._vy * dt)
+                else:
+                    b.shape = b.shape.shifted(b._vx * dt, b._vy * dt)
+                broadphase.update(b, b.shape)
+
+        # Find contacts
+
+        cache = self.contact_cache
+        contacts = []
+
+        margin = self.contact_margin
+
+        for b in awake:
+
+            rect = b.shape.get_rect().expanded(2 * margin, 2 * margin)
+
+            # query() returns a set; sort it so results don't depend on
+            # where the bodies happen to live in memory
+            for other in sorted(broadphase.query(rect, strict=False),
+                                key=lambda o: o._id):
+
+                if other is b or (other in wasawake and other._id < b._id):
+                    continue  # pairs of awake bodies are found from both
+
+                contact = cache.lookup(b, other)
+                contact.versions = None
+
+                if not other.awake and not other.static:
+                    if contact.vector == (0., 0.):
+                        continue
+                    other.wake()
+                    start[other] = (other.shape.cx, other.shape.cy)
+
+                contacts.append((b, other, contact))
+
+        cache.end_step()
+
+        # Solve
+
+        pushes = [[0., 0.] for _ in contacts]
+
+        for it in range(self.iterations):
+            for (a, b, contact), push in zip(contacts, pushes):
+
+                if it > 0:
+                    versions = (a._version, b._version)
+                    if versions == contact.versions:
+                        continue  # nothing moved since the last check
+                    contact.versions = versions
+                    dx, dy = collidevector_xy(a.shape, b.shape)
+                elif (self.warm_start and contact.hit and
+                        contact.correction is not None):
+                    dx, dy = contact.correction
+                    cache.warmstarts += 1
+                else:
+                    dx, dy = contact.vector
+
+                if not (dx or dy) or math.isnan(dx):
+                    continue
+
+                wa = a.invmass / (a.invmass + b.invmass)
+                wb = 1 - wa
+
+                if wa:
+                    a.shape = a.shape.shifted(dx * wa, dy * wa)
+                    a._version += 1
+                if wb:
+                    b.shape = b.shape.shifted(-dx * wb, -dy * wb)
+                    b._version += 1
+
+                push[0] += dx
+                push[1] += dy
+
+        for (_, _, contact), push in zip(contacts, pushes):
+            contact.correction = tuple(push)
+
+        for b in start:
+            broadphase.update(b, b.shape)
+
+        self.contacts = [(a, b) for a, b, _ in contacts]
+        self.islands = self._build_islands(start, contacts)
+
+        if self.sleep_time is not None:
+            self._update_sleep(dt, start)
+
+    def _sweep_move(self, body, dx, dy, maxhits=2):
+        """
+        moves body by (dx, dy), stopping and sliding at static bodies; after
+        maxhits slides, what's left of the motion stops at the next wall
+        """
+
+        for hits in range(maxhits + 1):
+
+            rect = body.shape.get_rect()
+            swept = FloatRect.from_sides(min(rect.left, rect.left + dx),
+                                         max(rect.right, rect.right + dx),
+                                         min(rect.bottom, rect.bottom + dy),
+                                         max(rect.top, rect.top + dy))
+
+            first = None
+
+            for other in sorted(self._broadphase.query(swept, strict=False),
+                                key=lambda o: o._id):
+                if other.static:
+                    try:
+                        hit = timeofimpact(body.shape, (dx, dy), other.shape)
+                    except NotImplementedError:
+                        continue  # no sweep for these shapes, left discrete
+                    if hit is not None and (first is None or hit.t < first.t):
+                        first = hit
+
+            if first is None:
+                body.shape = body.shape.shifted(dx, dy)
+                return
+
+            t, (nx, ny) = first
+            body.shape = body.shape.shifted(dx * t, dy * t)
+
+            if hits == maxhits:
+                return  # e.g. in a corner: sliding on could go through
+
+            # keep only the part of the remaining motion along the wall
+            dx, dy = dx * (1 - t), dy * (1 - t)
+            dot = dx * nx + dy * ny
+            if dot < 0:
+                dx, dy = dx - dot * nx, dy - dot * ny
+
+            if not (dx or dy):
+                return
+
+    def _build_islands(self, bodies, contacts):
+        """union-find over dynamic bodies connected by contacts"""
+
+        parent = {b: b for b in bodies}
+
+        def find(b):
+            while parent[b] is not b:
+                parent[b] = parent[parent[b]]
+                b = parent[b]
+            return b
+
+        for a, b, _ in contacts:
+            if not (a.static or b.static):
+                ra, rb = find(a), find(b)
+                if ra is not rb:
+                    parent[rb] = ra
+
+        islands = {}
+        for b in bodies:
+            islands.setdefault(find(b), []).append(b)
+
+        return list(islands.values())
+
+    def _update_sleep(self, dt, start):
+
+        for b, (x0, y0) in start.items():
+
+            speed = math.hypot(b.shape.cx - x0, b.shape.cy - y0) / dt
+
+            if speed < self.sleep_speed:
+                b._sleeptime += dt
+            else:
+                b._sleeptime = 0.
+
+        for island in self.islands:
+            if min(b._sleeptime for b in island) >= self.sleep_time:
+                for b in island:
+                    b.awake = False
@@ -0,0 +1,224 @@
+import json
+import time
+from collections import deque
+
+import numpy as np
+
+
+class _NullScope:
+    """what Profiler.scope() returns while disabled"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+
+_NULL_SCOPE = _NullScope()
+
+
+class _Scope:
+
+    __slots__ = ("_profiler", "name", "_starts")
+
+    def __init__(self, profiler, name):
+
+        self._profiler = profiler
+        self.name = name
+        self._starts = []
+
+    def __enter__(self):
+        self._starts.append(self._profiler.clock())
+        return self
+
+    def __exit__(self, *exc):
+
+        end = self._profiler.clock()
+        self._profiler._record(self.name, self._starts.pop(), end)
+        return False
+
+
+class Profiler:
+    """
+    Named timing scopes and counters, summed per frame
+
+    Wrap each phase of a frame in `with profiler.scope(name):` and call
+    end_frame() once per frame. The time spent in each scope during a
+    frame (nested scopes count towards their parents too), the whole
+    frame's time and each counter's total are kept for the last window
+    frames, from which stats() gives rolling percentiles.
+
+    Counters are bumped with count(), or sampled once per frame from a
+    callable registered with watch(): e.g. a cache's cumulative misses
+    (delta=True reports the increase since the previous frame), or a
+    per-frame figure such as Scene.blits.
+
+    With trace=True every scope and frame is also kept as an event (the
+    last max_events of them) for export_trace(), which writes Chrome
+    trace-event JSON, viewable in chrome://tracing or Perfetto.
+
+    While enabled is False, scope() returns a shared do-nothing context
+    manager and every other method returns straight away.
+    """
+
+    def __init__(self, enabled=True, window=240, trace=False,
+                 max_events=1_000_000, clock=time.perf_counter):
+
+        self.enabled = enabled
+        self.window = window
+        self.trace = trace
+        self.clock = clock
+
+        self._scopes = {}  # : dict(str -> _Scope)
+        self._frame = {}  # : dict(str -> float), this frame's scope times
+        self._counts = {}  # : dict(str -> number), this frame's counters
+        self._watches = {}  # : dict(str -> (callable, bool, last value))
+
+        self._history = {}  # : dict(str -> deque(float)), seconds
+        self._counters = {}  # : dict(str -> deque(number))
+
+        self._origin = clock()
+        self._framestart = None
+        self.frames = 0
+        self._events = deque(maxlen=max_events)  # : (name, start, end)
+        self._counterevents = deque(maxlen=max_events)  # : (time, dict)
+
+    # Recording
+
+    def scope(self, name):
+
+        if not self.enabled:
+            return _NULL_SCOPE
+
+        scope = self._scopes.get(name)
+        if scope is None:
+            scope = self._scopes[name] = _Scope(self, name)
+
+        return scope
+
+    def count(self, name, n=1):
+
+        if self.enabled:
+            self._counts[name] = self._counts.get(name, 0) + n
+
+    def watch(self, name, func, delta=False):
+        """samples func() as counter name at the end of every frame"""
+
+        last = func() if delta else None
+        self._watches[name] = (func, delta, last)
+
+    def _record(self, name, start, end):
+
+        self._frame[name] = self._frame.get(name, 0.) + (end - start)
+
+        if self.trace:
+            self._events.append((name, start, end))
+
+    def end_frame(self):
+
+        if not self.enabled:
+            self._framestart = None
+            return
+
+        now = self.clock()
+
+        if self._framestart is not None:
+            self._frame["frame"] = now - self._framestart
+            if self.trace:
+                self._events.append(("frame", self._framestart, now))
+
+        self._framestart = now
+
+        for name, (func, delta, last) in self._watches.items():
+
+            value = func()
+            if delta:
+                self._watches[name] = (func, delta, value)
+                # a reset counter restarts from 0
+                value = value - last if value >= last else value
+
+            self._counts[name] = self._counts.get(name, 0) + value
+
+        for name in self._frame.keys() - self._history.keys():
+            self._history[name] = deque(maxlen=self.window)
+        for name, times in self._history.items():
+            times.append(self._frame.get(name, 0.))
+
+        for name in self._counts.keys() - self._counters.keys():
+            self._counters[name] = deque(maxlen=self.window)
+        for name, counts in self._counters.items():
+            counts.append(self._counts.get(name, 0))
+
+        if self.trace and self._counts:
+            self._counterevents.append((now, dict(self._counts)))
+
+        self._frame = {}
+        self._counts = {}
+        self.frames += 1
+
+    def reset(self):
+        """forgets all history and trace events"""
+
+        self._history.clear()
+        self._counters.clear()
+        self._events.clear()
+        self._counterevents.clear()
+        self._frame = {}
+        self._counts = {}
+        self._framestart = None
+        self.frames = 0
+
+    # Results
+
+    def stats(self):
+        """
+        dict(phase -> dict) of p50, p95, p99 and mean in milliseconds over
+        the last window frames
+        """
+
+        out = {}
+
+        for name, times in self._history.items():
+            if times:
+                ms = np.array(times) * 1000
+                p50, p95, p99 = np.percentile(ms, (50, 95, 99))
+                out[name] = {"p50": p50, "p95": p95, "p99": p99,
+                             "mean": ms.mean()}
+
+        return out
+
+    def counters(self):
+        """dict(counter -> dict) of mean and max per frame"""
+
+        return {name: {"mean": float(np.mean(counts)),
+                       "max": max(counts)}
+                for name, counts in self._counters.items() if counts}
+
+    def trace_events(self):
+        """recorded events as Chrome trace-event dicts"""
+
+        origin = self._origin
+
+        def us(t):
+            return (t - origin) * 1e6
+
+        events = [{"name": name, "ph": "X", "ts": us(start),
+                   "dur": us(end) - us(start), "pid": 0, "tid": 0}
+                  for name, start, end in self._events]
+
+        events.extend({"name": "counters", "ph": "C", "ts": us(t),
+                       "pid": 0, "tid": 0, "args": counts}
+                      for t, counts in self._counterevents)
+
+        events.sort(key=lambda e: e["ts"])
+
+        return events
+
+    def export_trace(self, path):
+
+        with open(path, "w") as f:
+            json.dump({"traceEvents": self.trace_events(),
+                       "displayTimeUnit": "ms"}, f)
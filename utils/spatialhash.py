@@ -0,0 +1,173 @@
+import math
+
+
+class SpatialHash:
+    """
+    Uniform grid broadphase for FloatRects and FloatCircles
+
+    Objects are stored under a hashable key, and their bounding rect is
+    registered in every grid cell it overlaps. Updating an object whose
+    bounds stay within the same cells only replaces the stored rect, so
+    slow-moving objects are cheap to keep up to date.
+
+    cellsize should be around the size of a typical object: too small and
+    objects span many cells, too large and cells hold many objects.
+    """
+
+    def __init__(self, cellsize=1.0):
+
+        if cellsize <= 0:
+            raise ValueError("cellsize must be positive")
+
+        self._cellsize = float(cellsize)
+        self._cells = {}  # : dict((int, int) -> set(key))
+        self._entries = {}  # : dict(key -> [FloatRect, cellrange, int])
+        self._nextid = 0
+
+    @property
+    def cellsize(self):
+        return self._cellsize
+
+    def __len__(self):
+        return len(self._entries)
+
+    def __contains__(self, key):
+        return key in self._entries
+
+    def __iter__(self):
+        return iter(self._entries)
+
+    def get_rect(self, key):
+        return self._entries[key][0]
+
+    # Internals
+
+    def _cellrange(self, rect):
+
+        cs = self._cellsize
+        return (math.floor(rect.left / cs), math.floor(rect.bottom / cs),
+                math.floor(rect.right / cs), math.floor(rect.top / cs))
+
+    def _add_to_cells(self, key, cellrange):
+
+        i0, j0, i1, j1 = cellrange
+        cells = self._cells
+
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = cells.get((i, j))
+                if cell is None:
+                    cells[(i, j)] = {key}
+                else:
+                    cell.add(key)
+
+    def _remove_from_cells(self, key, cellrange):
+
+        i0, j0, i1, j1 = cellrange
+        cells = self._cells
+
+        for i in range(i0, i1 + 1):
+            for j in range(j0, j1 + 1):
+                cell = cells[(i, j)]
+                cell.discard(key)
+                if not cell:
+                    del cells[(i, j)]
+
+    # Methods
+
+    def insert(self, key, shape):
+        """Add shape (anything with get_rect()) under key"""
+
+        if key in self._entries:
+            raise ValueError(f"{key} is already in the spatial hash. "
+                             "Try update() instead?")
+
+        rect = shape.get_rect()
+        cellrange = self._cellrange(rect)
+
+        self._entries[key] = [rect, cellrange, self._nextid]
+        self._nextid += 1
+
+        self._add_to_cells(key, cellrange)
+
+    def update(self, key, shape):
+        """Move key to new bounds, touching only the cells that changed"""
+
+        entry = self._entries[key]
+        rect = shape.get_rect()
+        cellrange = self._cellrange(rect)
+
+        entry[0] = rect
+
+        if cellrange != entry[1]:
+            self._remove_from_cells(key, entry[1])
+            self._add_to_cells(key, cellrange)
+            entry[1] = cellrange
+
+    def remove(self, key):
+
+        rect, cellrange, _ = self._entries.pop(key)
+        self._remove_from_cells(key, cellrange)
+
+    def clear(self):
+
+        self._cells.clear()
+        self._entries.clear()
+
+    def query(self, rect, strict=True):
+        """Set of keys whose bounds collide with rect"""
+
+        cells = self._cells
+        entries = self._entries
+        i0, j0, i1, j1 = self._cellrange(rect)
+
+        candidates = set()
+
+        # for very large query regions it's cheaper to scan occupied cells
+        if (i1 - i0 + 1) * (j1 - j0 + 1) > len(cells):
+            for (i, j), cell in cells.items():
+                if i0 <= i <= i1 and j0 <= j <= j1:
+                    candidates.update(cell)
+        else:
+            for i in range(i0, i1 + 1):
+                for j in range(j0, j1 + 1):
+                    cell = cells.get((i, j))
+                    if cell is not None:
+                        candidates.update(cell)
+
+        return {key for key in candidates
+                if entries[key][0].colliderect(rect, strict=strict)}
+
+    def pairs(self, strict=True):
+        """
+        List of (key1, key2) pairs whose bounds collide
+
+        Each pair is reported once, with key1 inserted before key2.
+        """
+
+        entries = self._entries
+        seen = set()
+        result = []
+
+        for cell in self._cells.values():
+
+            if len(cell) < 2:
+                continue
+
+            members = sorted(cell, key=lambda k: entries[k][2])
+
+            for n, ka in enumerate(members):
+
+                ra = entries[ka][0]
+
+                for kb in members[n + 1:]:
+
+                    pair = (ka, kb)
+                    if pair in seen:
+                        continue
+                    seen.add(pair)
+
+                    if ra.colliderect(entries[kb][0], strict=strict):
+                        result.append(pair)
+
+        return result
@@ -0,0 +1,288 @@
+class _Proxy:
+
+    __slots__ = ("key", "id", "box", "stepbox", "endpoints")
+
+    def __init__(self, key, id_, box):
+
+        self.key = key
+        self.id = id_
+        self.box = box  # : (left, bottom, right, top)
+        self.stepbox = None  # : box as of the last step
+        self.endpoints = None
+
+
+class _Endpoint:
+
+    __slots__ = ("value", "rank", "ismin", "index", "proxy")
+
+    def __init__(self, proxy, index, ismin):
+
+        self.proxy = proxy
+        self.index = index  # : index into proxy.box
+        self.ismin = ismin
+        self.value = None
+        self.rank = None  # : order among endpoints of equal value
+
+    def refresh(self, box):
+
+        value = self.value = box[self.index]
+
+        # at equal values, max endpoints come first: touching isn't
+        # overlapping; but a proxy flat along the axis must still start
+        # before it ends, so its own min and max go in between, min first
+        if value == box[self.index ^ 2]:
+            self.rank = 1 if self.ismin else 2
+        else:
+            self.rank = 3 if self.ismin else 0
+
+
+def _sides(rect):
+    return (rect.left, rect.bottom, rect.right, rect.top)
+
+
+def _overlaps(a, b):
+    return not (a[0] >= b[2] or a[2] <= b[0] or a[1] >= b[3] or a[3] <= b[1])
+
+
+def _touches(a, b):
+    return not (a[0] > b[2] or a[2] < b[0] or a[1] > b[3] or a[3] < b[1])
+
+
+def _sortkey(ep):
+    return (ep.value, ep.rank)
+
+
+class SweepAndPrune:
+    """
+    Sweep-and-prune broadphase over FloatRect bounds
+
+    Keeps the endpoints of every object's bounds sorted along both axes.
+    Between steps objects only move a little, so re-sorting by insertion
+    sort costs close to O(N), and every swap of a min past a max (or vice
+    versa) tells us exactly which pairs started or stopped overlapping.
+
+    The set of overlapping pairs persists between steps, and step()
+    reports which pairs were added and removed since the last step.
+    Shapes can be anything with a get_rect() method, so FloatCircles are
+    tracked through their bounding rect.
+    """
+
+    def __init__(self, rebuild_fraction=0.25):
+
+        # inserting more than this fraction of objects in one step falls
+        # back to a full sort rather than sorting new endpoints into place
+        self.rebuild_fraction = rebuild_fraction
+
+        self._proxies = {}  # : dict(key -> _Proxy)
+        self._axes = ([], [])  # : endpoints sorted along x, y
+        self._pending = []
+        self._removed_proxies = False
+        self._nextid = 0
+
+        self._pairs = set()
+        self._partners = {}  # : dict(key -> set(key))
+        self._added = set()
+        self._removed = set()
+
+    # Properties
+
+    @property
+    def pairs(self):
+        """set of (key1, key2) pairs overlapping as of the last step"""
+        return self._pairs
+
+    def __len__(self):
+        return len(self._proxies)
+
+    def __contains__(self, key):
+        return key in self._proxies
+
+    def __iter__(self):
+        return iter(self._proxies)
+
+    # Public methods
+
+    def insert(self, key, shape):
+        """Add shape (anything with get_rect()); takes effect on step()"""
+
+        if key in self._proxies:
+            raise ValueError(f"{key} is already in the world. "
+                             "Try update() instead?")
+
+        proxy = _Proxy(key, self._nextid, _sides(shape.get_rect()))
+        self._nextid += 1
+
+        self._proxies[key] = proxy
+        self._partners[key] = set()
+        self._pending.append(proxy)
+
+    def update(self, key, shape):
+        """Set new bounds for key; takes effect on step()"""
+        self._proxies[key].box = _sides(shape.get_rect())
+
+    def remove(self, key):
+        """Remove key, immediately reporting its pairs as removed"""
+
+        proxy = self._proxies.pop(key)
+
+        for other in list(self._partners[key]):
+            self._remove_pair(proxy, self._proxies[other])
+        del self._partners[key]
+
+        if proxy.endpoints is None:
+            self._pending.remove(proxy)
+        else:
+            self._removed_proxies = True
+
+    def step(self):
+        """
+        Bring the sorted endpoints and pair set up to date
+
+        returns (added, removed): sets of pairs which started or stopped
+            overlapping since the previous step
+        """
+
+        if self._removed_proxies:
+            for axis in self._axes:
+                axis[:] = [ep for ep in axis if self._islive(ep.proxy)]
+            self._removed_proxies = False
+
+        pending, self._pending = self._pending, []
+
+        for proxy in pending:
+            proxy.endpoints = (_Endpoint(proxy, 0, True),
+                               _Endpoint(proxy, 2, False),
+                               _Endpoint(proxy, 1, True),
+                               _Endpoint(proxy, 3, False))
+            self._axes[0].extend(proxy.endpoints[:2])
+            self._axes[1].extend(proxy.endpoints[2:])
+
+        for proxy in self._proxies.values():
+            box = proxy.stepbox = proxy.box
+            for ep in proxy.endpoints:
+                ep.refresh(box)
+
+        if len(pending) > self.rebuild_fraction * len(self._proxies):
+            self._rebuild()
+        else:
+            for axis in self._axes:
+                self._insertion_sort(axis)
+
+        added, removed = self._added, self._removed
+        self._added, self._removed = set(), set()
+
+        return added, removed
+
+    def query(self, rect, strict=True):
+        """Set of keys whose bounds (as of the last step) collide with rect"""
+
+        box = _sides(rect)
+        test = _overlaps if strict else _touches
+        found = set()
+
+        for ep in self._axes[0]:
+
+            if ep.value > box[2] or (strict and ep.value == box[2]):
+                break
+
+            if ep.ismin and test(ep.proxy.stepbox, box) and \
+                    self._islive(ep.proxy):
+                found.add(ep.proxy.key)
+
+        return found
+
+    def _islive(self, proxy):
+        # by identity: a key removed and inserted again has a new proxy,
+        # and the old one's endpoints stay in the axes until the next step
+        return self._proxies.get(proxy.key) is proxy
+
+    # Pair bookkeeping
+
+    def _add_pair(self, a, b):
+
+        pair = (a.key, b.key) if a.id < b.id else (b.key, a.key)
+        if pair in self._pairs:
+            return
+
+        self._pairs.add(pair)
+        self._partners[a.key].add(b.key)
+        self._partners[b.key].add(a.key)
+
+        if pair in self._removed:
+            self._removed.discard(pair)
+        else:
+            self._added.add(pair)
+
+    def _remove_pair(self, a, b):
+
+        pair = (a.key, b.key) if a.id < b.id else (b.key, a.key)
+        if pair not in self._pairs:
+            return
+
+        self._pairs.discard(pair)
+        self._partners[a.key].discard(b.key)
+        self._partners[b.key].discard(a.key)
+
+        if pair in self._added:
+            self._added.discard(pair)
+        else:
+            self._removed.add(pair)
+
+    # Sorting
+
+    def _insertion_sort(self, axis):
+
+        for i in range(1, len(axis)):
+
+            ep = axis[i]
+            value, rank, ismin = ep.value, ep.rank, ep.ismin
+            j = i - 1
+
+            while j >= 0:
+
+                other = axis[j]
+                if other.value < value or (other.value == value and
+                                           other.rank <= rank):
+                    break
+
+                # ep moves left past other
+                if ismin and not other.ismin:
+                    if _overlaps(ep.proxy.box, other.proxy.box):
+                        self._add_pair(ep.proxy, other.proxy)
+                elif not ismin and other.ismin:
+                    self._remove_pair(ep.proxy, other.proxy)
+
+                axis[j + 1] = other
+                j -= 1
+
+            axis[j + 1] = ep
+
+    def _rebuild(self):
+        """full sort of both axes and sweep along x to find every pair"""
+
+        for axis in self._axes:
+            axis.sort(key=_sortkey)
+
+        current = {}
+        active = {}
+
+        for ep in self._axes[0]:
+
+            proxy = ep.proxy
+
+            if ep.ismin:
+                for other in active.values():
+                    if _overlaps(proxy.box, other.box):
+                        current[(proxy.key, other.key) if proxy.id < other.id
+                                else (other.key, proxy.key)] = (proxy, other)
+                active[proxy.id] = proxy
+            else:
+                del active[proxy.id]
+
+        for pair in list(self._pairs):
+            if pair not in current:
+                self._remove_pair(self._proxies[pair[0]],
+                                  self._proxies[pair[1]])
+
+        for a, b in current.values():
+            self._add_pair(a, b)
@@ -0,0 +1,196 @@
+"""
+Swept (continuous) collision queries
+
+Each function moves the first shape along displacement (dx, dy) against
+a stationary second shape and returns an Impact: the fraction t in
+[0, 1] of the displacement at which the shapes first touch, and the unit
+normal of the second shape at the point of contact. If the shapes don't
+meet along the way, None is returned.
+
+Shapes which already overlap at t = 0 (e.g. through rounding after a
+previous impact) give an impact at t = 0 along their collidevector if
+the displacement drives them further in, and None otherwise.
+"""
+
+import math
+from collections import namedtuple
+
+from utils.collide import collidevector_xy
+from utils.floatshapes import FloatRect, FloatCircle
+
+
+Impact = namedtuple("Impact", ["t", "normal"])
+
+
+def _initial_impact(a, displacement, b):
+    """
+    (True, Impact or None) if a and b already overlap, (False, None) if not
+    """
+
+    cx, cy = collidevector_xy(a, b)
+    norm = math.hypot(cx, cy)
+
+    if not norm > 0:
+        return False, None
+
+    nx, ny = cx / norm, cy / norm
+    if displacement[0] * nx + displacement[1] * ny < 0:
+        return True, Impact(0., (nx, ny))
+
+    return True, None
+
+
+def _raycast_box(ox, oy, dx, dy, left, bottom, right, top):
+    """
+    slab test of segment o + t d against box, returns (t, normal) or None
+    """
+
+    tenter, texit = -math.inf, math.inf
+    normal = None
+
+    for o, d, lo, hi, axis in ((ox, dx, left, right, 0),
+                               (oy, dy, bottom, top, 1)):
+
+        if d == 0:
+            if o <= lo or o >= hi:
+                return None
+            continue
+
+        t1, t2 = (lo - o) / d, (hi - o) / d
+        if t1 > t2:
+            t1, t2 = t2, t1
+
+        if t1 > tenter:
+            tenter = t1
+            normal = (-math.copysign(1., d), 0.) if axis == 0 \
+                else (0., -math.copysign(1., d))
+
+        texit = min(texit, t2)
+
+    if normal is None or tenter >= texit or tenter < 0 or tenter > 1:
+        return None
+
+    return tenter, normal
+
+
+def _raycast_circle(ox, oy, dx, dy, cx, cy, r):
+    """first t in [0, 1] at which o + t d is at distance r from c"""
+
+    fx, fy = ox - cx, oy - cy
+    a = dx**2 + dy**2
+    b = fx * dx + fy * dy
+    c = fx**2 + fy**2 - r**2
+
+    disc = b**2 - a * c
+    if a == 0 or disc <= 0:
+        return None
+
+    t = (-b - math.sqrt(disc)) / a
+    if t < 0 or t > 1:
+        return None
+
+    return t
+
+
+def sweep_rectrect(a, displacement, b):
+
+    overlapping, hit = _initial_impact(a, displacement, b)
+    if overlapping:
+        return hit
+
+    dx, dy = displacement
+
+    # sweep the bottomleft corner of a against b grown by a's size
+    hit = _raycast_box(a.left, a.bottom, dx, dy,
+                       b.left - a.width, b.bottom - a.height,
+                       b.right, b.top)
+
+    return None if hit is None else Impact(*hit)
+
+
+def sweep_circlerect(a, displacement, b):
+
+    overlapping, hit = _initial_impact(a, displacement, b)
+    if overlapping:
+        return hit
+
+    dx, dy = displacement
+    cx, cy, r = a.cx, a.cy, a.r
+
+    # sweep the center of a against b grown by r; the grown box has square
+    # corners where the real shape has rounded ones, checked below
+
+    left, bottom, right, top = b.left - r, b.bottom - r, b.right + r, b.top + r
+
+    if left < cx < right and bottom < cy < top:
+        # already inside a square corner, but outside the rounded one
+        px, py = cx, cy
+    else:
+        hit = _raycast_box(cx, cy, dx, dy, left, bottom, right, top)
+
+        if hit is None:
+            return None
+
+        t, normal = hit
+        px, py = cx + t * dx, cy + t * dy
+
+        if b.left <= px <= b.right or b.bottom <= py <= b.top:
+            return Impact(t, normal)
+
+    kx = b.left if px < b.left else b.right
+    ky = b.bottom if py < b.bottom else b.top
+
+    t = _raycast_circle(cx, cy, dx, dy, kx, ky, r)
+    if t is None:
+        return None
+
+    return Impact(t, ((cx + t * dx - kx) / r, (cy + t * dy - ky) / r))
+
+
+def sweep_circlecircle(a, displacement, b):
+
+    overlapping, hit = _initial_impact(a, displacement, b)
+    if overlapping:
+        return hit
+
+    dx, dy = displacement
+    r = a.r + b.r
+
+    t = _raycast_circle(a.cx, a.cy, dx, dy, b.cx, b.cy, r)
+    if t is None:
+        return None
+
+    nx, ny = (a.cx + t * dx - b.cx) / r, (a.cy + t * dy - b.cy) / r
+    return Impact(t, (nx, ny))
+
+
+def sweep_rectcircle(a, displacement, b):
+
+    # a moving rect hits b as b moving the other way would hit the rect
+    dx, dy = displacement
+    hit = sweep_circlerect(b, (-dx, -dy), a)
+
+    if hit is None:
+        return None
+
+    return Impact(hit.t, (-hit.normal[0], -hit.normal[1]))
+
+
+_SWEEPS = {
+    (FloatRect, FloatRect): sweep_rectrect,
+    (FloatCircle, FloatRect): sweep_circlerect,
+    (FloatRect, FloatCircle): sweep_rectcircle,
+    (FloatCircle, FloatCircle): sweep_circlecircle,
+}
+
+
+def timeofimpact(a, displacement, b):
+    """Impact of a moving along displacement against b, or None"""
+
+    try:
+        sweep = _SWEEPS[(a.__class__, b.__class__)]
+    except KeyError:
+        raise NotImplementedError(f"no sweep for ({type(a).__name__}, "
+                                  f"{type(b).__name__})") from None
+
+    return sweep(a, displacement, b)